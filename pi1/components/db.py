@@ -1,5 +1,4 @@
-import json
-from globals import batch, publish_limit, counter_lock, publish_event
+from publisher import enqueue
 
 class DoorBuzzer:
     def __init__(self, settings):
@@ -15,8 +14,6 @@ class DoorBuzzer:
             self.impl = SimulationBuzzer(settings)
 
     def _publish_state(self):
-        global publish_limit
-
         payload = {
             "measurement": "BuzzerState",
             "simulated": self.settings["simulated"],
@@ -26,11 +23,7 @@ class DoorBuzzer:
         }
 
         topic = f"{self.settings['runs_on']}/{self.settings['name']}"
-        with counter_lock:
-            batch.append((topic, json.dumps(payload), 0, True))
-
-            if len(batch) >= publish_limit:
-                publish_event.set()
+        enqueue(topic, payload, payload["measurement"])
 
     def on(self):
         self._state = True
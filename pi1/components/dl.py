@@ -1,5 +1,4 @@
-import json
-from globals import batch, publish_limit, counter_lock, publish_event
+from publisher import enqueue
 
 class DoorLight:
     def __init__(self, settings):
@@ -15,8 +14,6 @@ class DoorLight:
             self.impl = SimulationLED(settings)
 
     def _publish_state(self):
-        global publish_limit
-
         payload = {
             "measurement": "LightState",
             "simulated": self.settings["simulated"],
@@ -25,11 +22,7 @@ class DoorLight:
             "value": int(self._state)
         }
         topic = f"{self.settings['runs_on']}/{self.settings['name']}"
-        with counter_lock:
-            batch.append((topic, json.dumps(payload), 0, True))
-
-            if len(batch) >= publish_limit:
-                publish_event.set()
+        enqueue(topic, payload, payload["measurement"])
 
     def on(self):
         self._state = True
@@ -1,8 +1,10 @@
-import json
+import logging
 import time
 import threading
 
-from globals import batch, publish_limit, counter_lock, publish_event
+from publisher import enqueue
+
+log = logging.getLogger(__name__)
 
 
 class DmsKeypad:
@@ -61,8 +63,6 @@ class DmsKeypad:
         raise ValueError(f"Key '{key_label}' not found in DMS layout")
 
     def _publish_key_pressed(self, idx: int):
-        global publish_limit
-
         payload = {
             "measurement": "DMS",
             "simulated": self.settings["simulated"],
@@ -73,10 +73,7 @@ class DmsKeypad:
         }
 
         topic = f"{self.settings['runs_on']}/{self.settings['name']}"
-        with counter_lock:
-            batch.append((topic, json.dumps(payload), 0, True))
-            if len(batch) >= publish_limit:
-                publish_event.set()
+        enqueue(topic, payload, payload["measurement"])
 
     def _on_key_change(self, idx: int, state: int):
         idx = int(idx)
@@ -90,8 +87,8 @@ class DmsKeypad:
             return
 
         if self.verbose:
-            ts = time.strftime("%H:%M:%S", time.localtime())
-            print(f"[{self.settings['name']}] {ts} key={self._key_label(idx)} idx={idx} PRESSED")
+            name = self.settings['name']
+            log.info("[%s] key=%s idx=%s PRESSED", name, self._key_label(idx), idx, extra={"category": name})
 
         self._publish_key_pressed(idx)
 
@@ -1,7 +1,9 @@
-import json
+import logging
 import time
 import threading
-from globals import batch, publish_limit, counter_lock, publish_event
+from publisher import enqueue
+
+log = logging.getLogger(__name__)
 
 
 class DoorPir:
@@ -28,8 +30,6 @@ class DoorPir:
             self.impl = SimulationPir(settings, on_change=self._on_motion_change)
 
     def _publish_state(self):
-        global publish_limit
-
         payload = {
             "measurement": "Motion",
             "simulated": self.settings["simulated"],
@@ -41,10 +41,7 @@ class DoorPir:
 
         topic = f"{self.settings['runs_on']}/{self.settings['name']}"
 
-        with counter_lock:
-            batch.append((topic, json.dumps(payload), 0, True))
-            if len(batch) >= publish_limit:
-                publish_event.set()
+        enqueue(topic, payload, payload["measurement"])
 
     def _on_motion_change(self, value: int):
         value = 1 if value else 0
@@ -56,8 +53,8 @@ class DoorPir:
         self._last_change_ts = time.time()
 
         if self.verbose:
-            ts = time.strftime("%H:%M:%S", time.localtime())
-            print(f"[{self.settings['name']}] {ts} MOTION={self._state}")
+            name = self.settings['name']
+            log.info("[%s] MOTION=%s", name, self._state, extra={"category": name})
 
         self._publish_state()
 
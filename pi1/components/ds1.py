@@ -1,8 +1,10 @@
-import json
+import logging
 import time
 import threading
 
-from globals import batch, publish_limit, counter_lock, publish_event
+from publisher import enqueue
+
+log = logging.getLogger(__name__)
 
 
 class DoorSensor:
@@ -30,8 +32,6 @@ class DoorSensor:
             self.impl = RealDoorSensor(settings, on_change=self._on_state_change)
 
     def _publish_state(self):
-        global publish_limit
-
         payload = {
             "measurement": "Button",
             "simulated": self.settings["simulated"],
@@ -42,10 +42,7 @@ class DoorSensor:
 
         topic = f"{self.settings['runs_on']}/{self.settings['name']}"
 
-        with counter_lock:
-            batch.append((topic, json.dumps(payload), 0, True))
-            if len(batch) >= publish_limit:
-                publish_event.set()
+        enqueue(topic, payload, payload["measurement"])
 
     def _on_state_change(self, value: int):
         value = 1 if value else 0
@@ -56,9 +53,9 @@ class DoorSensor:
             self._state = value
 
         if self.verbose:
-            ts = time.strftime("%H:%M:%S", time.localtime())
             label = "PRESSED" if self._state else "RELEASED"
-            print(f"[{self.settings['name']}] {ts} {label} (value={self._state})")
+            name = self.settings['name']
+            log.info("[%s] %s (value=%s)", name, label, self._state, extra={"category": name})
 
         self._publish_state()
 
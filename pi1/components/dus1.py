@@ -1,8 +1,7 @@
-import json
 import time
 import threading
 
-from globals import batch, publish_limit, counter_lock, publish_event
+from publisher import enqueue
 
 
 class DoorUltrasonic:
@@ -28,8 +27,6 @@ class DoorUltrasonic:
             self.impl = RealUltrasonic(settings, on_distance=self._on_distance)
 
     def _publish_distance(self, distance_cm: float):
-        global publish_limit
-
         payload = {
             "measurement": "Distance",
             "simulated": self.settings["simulated"],
@@ -39,10 +36,7 @@ class DoorUltrasonic:
         }
 
         topic = f"{self.settings['runs_on']}/{self.settings['name']}"
-        with counter_lock:
-            batch.append((topic, json.dumps(payload), 0, True))
-            if len(batch) >= publish_limit:
-                publish_event.set()
+        enqueue(topic, payload, payload["measurement"])
 
     def _on_distance(self, distance_cm: float):
         try:
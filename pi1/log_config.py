@@ -0,0 +1,164 @@
+import atexit
+import copy
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+
+
+DEFAULT_FORMAT = "%(asctime)s %(levelname)-7s %(name)s: %(message)s"
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Token bucket po kategoriji:
+    - kategorija je `extra={"category": ...}` (npr. ime senzora), inace ime logger-a
+    - rate_per_s linija u sekundi, do `burst` odjednom
+    - rates: {prefiks imena logger-a: rate_per_s} za posebna ogranicenja
+    - broj odbacenih linija se dopisuje na sledecu propustenu liniju te kategorije
+    - linije od nivoa exempt_level navise (greske, alarmi) se nikad ne odbacuju;
+      ogranicava se samo brbljivi INFO/DEBUG
+    """
+
+    def __init__(self, rate_per_s=5.0, burst=10, rates=None, exempt_level=logging.WARNING):
+        super().__init__()
+        if isinstance(exempt_level, str):
+            exempt_level = logging.getLevelName(exempt_level.upper())
+        self.exempt_level = exempt_level
+        self.rate_per_s = float(rate_per_s)
+        self.burst = float(burst)
+        self.rates = sorted((rates or {}).items(), key=lambda kv: -len(kv[0]))
+        self._buckets = {}      # kategorija -> [tokens, last_ts, suppressed]
+        self._lock = threading.Lock()
+
+    def _rate_for(self, logger_name):
+        for prefix, rate in self.rates:
+            if logger_name == prefix or logger_name.startswith(prefix + "."):
+                return float(rate)
+        return self.rate_per_s
+
+    def filter(self, record):
+        if self.exempt_level is not None and record.levelno >= self.exempt_level:
+            return True
+
+        rate = self._rate_for(record.name)
+        if rate <= 0:
+            return True
+
+        key = (record.name, getattr(record, "category", None))
+        now = time.monotonic()
+
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [self.burst, now, 0]
+            else:
+                bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * rate)
+                bucket[1] = now
+
+            if bucket[0] < 1.0:
+                bucket[2] += 1
+                return False
+
+            bucket[0] -= 1.0
+            suppressed = bucket[2]
+            bucket[2] = 0
+
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+
+class _SuppressedFormatter(logging.Formatter):
+    def format(self, record):
+        s = super().format(record)
+        suppressed = getattr(record, "suppressed", 0)
+        if suppressed:
+            s += f" (+{suppressed} suppressed)"
+        return s
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Hot path samo ubacuje record u bounded red; formatiranje i pisanje
+    radi QueueListener nit. Kada je red pun, linija se odbacuje.
+    """
+
+    def __init__(self, q):
+        super().__init__(q)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # poruka se sklapa odmah, u niti koja loguje: args (npr. dict sa payload-om)
+        # mogu da se promene pre nego sto listener nit dodje do record-a; traceback
+        # ostaje kao exc_text, pa ga listener formatter i dalje ispisuje
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = _EXC_FORMATTER.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_listener = None
+_EXC_FORMATTER = logging.Formatter()
+
+
+def _parse_levels(s: str) -> dict:
+    # "controller=DEBUG,influx_writer=WARNING"
+    out = {}
+    for part in (s or "").split(","):
+        if "=" in part:
+            name, level = part.split("=", 1)
+            out[name.strip()] = level.strip().upper()
+    return out
+
+
+def setup_logging(level="INFO", levels=None, rate_per_s=5.0, burst=10, rates=None,
+                  fmt=DEFAULT_FORMAT, max_queue=10000, stream=None, rate_exempt_level="WARNING"):
+    """
+    Podesava root logger jednom po procesu.
+    - levels: {ime modula/logger-a: nivo}
+    - rate_exempt_level: od ovog nivoa navise linije ne prolaze kroz rate limit
+      (None = ogranicava se sve)
+    - env LOG_LEVEL i LOG_LEVELS ("ime=NIVO,...") imaju prednost nad argumentima
+    """
+    global _listener
+
+    if _listener is not None:
+        return _listener
+
+    level = os.environ.get("LOG_LEVEL", level)
+    levels = dict(levels or {})
+    levels.update(_parse_levels(os.environ.get("LOG_LEVELS", "")))
+
+    out = logging.StreamHandler(stream or sys.stdout)
+    out.setFormatter(_SuppressedFormatter(fmt, datefmt="%H:%M:%S"))
+
+    q = queue.Queue(maxsize=int(max_queue))
+    handler = NonBlockingQueueHandler(q)
+    handler.addFilter(RateLimitFilter(rate_per_s=rate_per_s, burst=burst, rates=rates,
+                                      exempt_level=rate_exempt_level))
+
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(str(level).upper())
+
+    for name, lvl in levels.items():
+        logging.getLogger(name).setLevel(str(lvl).upper())
+
+    _listener = logging.handlers.QueueListener(q, out, respect_handler_level=False)
+    _listener.start()
+    atexit.register(_listener.stop)
+    return _listener
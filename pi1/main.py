@@ -1,8 +1,9 @@
 import threading
 import time
 
-from publisher import start_publisher_thread
+from publisher import configure as configure_publisher, start_publisher_thread
 from settings.settings import load_settings
+from log_config import setup_logging
 from components.dms import DmsKeypad
 from components.ds1 import DoorSensor
 from components.dpir1 import DoorPir
@@ -16,8 +17,11 @@ try:
 except Exception:
     pass
 import json
+import logging
 import paho.mqtt.client as mqtt
 
+log = logging.getLogger("pi1")
+
 def start_local_dpir1_to_dl_thread(dpir1, door_light, stop_event, on_seconds=10.0, cooldown_s=0.5):
     def loop():
         last_on_until = 0.0
@@ -47,14 +51,14 @@ def start_buzzer_mqtt_listener(door_buzzer, stop_event, broker="127.0.0.1", port
     TOPIC_DB_CMD = "home/actuators/db/cmd"
 
     def on_connect(client, userdata, flags, rc):
-        print("BUZZER MQTT CONNECTED:", rc)
+        log.info("BUZZER MQTT CONNECTED: %s", rc)
         client.subscribe(TOPIC_DB_CMD)
 
     def on_message(client, userdata, msg):
         try:
             data = json.loads(msg.payload.decode())
         except Exception as e:
-            print("BUZZER MQTT JSON ERROR:", e, msg.payload)
+            log.warning("BUZZER MQTT JSON ERROR: %s %s", e, msg.payload)
             return
 
         cmd = str(data.get("command", "")).upper()
@@ -67,7 +71,7 @@ def start_buzzer_mqtt_listener(door_buzzer, stop_event, broker="127.0.0.1", port
             ms = int(data.get("ms", 2000))
             door_buzzer.beep(ms)
         else:
-            print("BUZZER MQTT: unknown command:", data)
+            log.warning("BUZZER MQTT: unknown command: %s", data)
 
     def loop():
         client = mqtt.Client()
@@ -137,6 +141,8 @@ if __name__ == "__main__":
     print("Starting")
 
     settings = load_settings()
+    setup_logging(**settings.get("LOGGING", {}))
+    configure_publisher(**settings.get("PUBLISHER", {}))
     threads = []
     stop_event = threading.Event()
 
@@ -1,29 +1,658 @@
 import json
+import logging
 import threading
 import time
-from paho.mqtt import publish
 
-from globals import batch, publish_limit, counter_lock, publish_event
+import paho.mqtt.client as mqtt
+
+import compact
+import globals as g
+from latency import LatencySamples
+from outbox import Outbox
 
 HOSTNAME = "localhost"
 PORT = 1883
+KEEPALIVE_S = 60
+
+# najvise QoS>0 poruka bez PUBACK-a odjednom (QoS 0 ne ceka potvrdu)
+MAX_INFLIGHT = 20
+
+# automatski reconnect: 1s, 2s, 4s ... najvise 30s
+RECONNECT_MIN_S = 1
+RECONNECT_MAX_S = 30
+
+# koliko flush ceka na konekciju pre nego sto vrati batch u red
+CONNECT_WAIT_S = 2.0
+
+# dve trake:
+# - urgent: bezbednosni dogadjaji, salju se odmah i sa QoS urgent_qos (PUBACK)
+# - bulk:   telemetrija, flush kad je batch pun (publish_limit) ili kad
+#           najstarija poruka ceka max_linger_s, QoS kako je poslat (0)
+DEFAULT_MAX_LINGER_S = 0.2
+DEFAULT_URGENT = ("Button", "Motion", "DMS", "BuzzerState")
+DEFAULT_URGENT_QOS = 1
+
+# stanja (periodicna ocitavanja): u redu ostaje samo poslednja vrednost po topic-u;
+# dogadjaji (tasteri, pokret, DMS, IR, IMU uzorci) se nikad ne spajaju
+DEFAULT_COALESCE = ("DHTHumidity", "DHTTemperature", "Distance", "SD4", "LCD")
+NEVER_COALESCE = ("Button", "Motion", "DMS", "IR", "IMU", "BuzzerState")
+
+# red je ogranicen; kad je pun:
+# - "drop_oldest":    izbaci najstarije poruke
+# - "drop_telemetry": prvo izbaci najstariju telemetriju, dogadjaje (urgentne) tek na kraju
+# - "block":          producer ceka do block_timeout_s, zatim se nova poruka odbacuje
+DEFAULT_MAX_QUEUE = 1000
+DEFAULT_OVERFLOW = "drop_telemetry"
+DEFAULT_BLOCK_TIMEOUT_S = 1.0
+OVERFLOW_POLICIES = ("drop_oldest", "drop_telemetry", "block")
+
+# backoff posle greske u publisher petlji: 0.5s, 1s, 2s ... najvise 30s
+ERROR_BACKOFF_MIN_S = 0.5
+ERROR_BACKOFF_MAX_S = 30.0
+
+# format poruka: "json" ili "compact" (binarni, compact.py); controller prepoznaje oba
+ENCODINGS = ("json", "compact")
+
+# outbox (store-and-forward na disku): najvise poslatih a nepotvrdjenih redova
+# (red se brise tek posle on_publish za njegov mid)
+DEFAULT_OUTBOX_DRAIN_BATCH = 500
+
+# kasnjenje po traci: od enqueue do upisa u socket (QoS 0) ili PUBACK-a (QoS 1)
+LATENCY_SAMPLES = 1024
+MAX_TRACKED_MIDS = 1000
+
+# najvise bulk poruka predatih paho-u a jos neupisanih u socket; inace bi
+# hitna poruka cekala iza hiljada telemetrijskih u paho izlaznom redu
+BULK_WINDOW = 100
+DEFAULT_STATS_LOG_S = 60.0
+
+log = logging.getLogger("publisher")
+
+_client = None
+_connected = threading.Event()
+_connected_since = 0.0      # time.time() poslednje uspesne konekcije
+
+_publish_limit = g.publish_limit
+_max_linger_s = DEFAULT_MAX_LINGER_S
+_urgent = frozenset(DEFAULT_URGENT)
+_urgent_qos = DEFAULT_URGENT_QOS
+_coalesce = frozenset(DEFAULT_COALESCE)
+_max_queue = DEFAULT_MAX_QUEUE
+_overflow = DEFAULT_OVERFLOW
+_block_timeout_s = DEFAULT_BLOCK_TIMEOUT_S
+_encoding = "json"
+_outbox = None
+_outbox_drain_batch = DEFAULT_OUTBOX_DRAIN_BATCH
+_stats_log_s = DEFAULT_STATS_LOG_S
+
+# stanje redova, menja se pod g.batch_cond; g.urgent_batch je hitna traka,
+# g.batch telemetrija; stavke: (topic, payload, qos, retain, urgent, ts, coalesce)
+_oldest = None          # time.monotonic() najstarije poruke u g.batch
+_flush_now = False
+
+_latency = {"urgent": LatencySamples(LATENCY_SAMPLES), "bulk": LatencySamples(LATENCY_SAMPLES)}
+
+# mid -> (urgent, ts, qos, outbox id) dok paho ne javi on_publish; PUBACK moze
+# stici i pre nego sto publish() vrati mid, tada se vreme cuva u _early_acks
+_mid_lock = threading.Lock()
+_inflight = {}
+_early_acks = {}
+_unsent = {True: 0, False: 0}      # urgent -> broj poruka u _inflight
+_acked_rows = []                   # outbox id-jevi potvrdjeni preko on_publish, ceka ack()
+
+_stats = {"enqueued": 0, "coalesced": 0, "published": 0, "dropped": 0, "retried": 0, "errors": 0}
+
+
+def configure(publish_limit=None, max_linger_s=None, urgent_measurements=None,
+              urgent_qos=None, coalesce_measurements=None, max_queue=None, overflow=None,
+              block_timeout_s=None, encoding=None, outbox=None, stats_log_s=None):
+    """
+    Podesavanja iz settings.json ("PUBLISHER"), poziva se pre start_publisher_thread.
+    outbox: {"enabled", "path", "max_rows", "drain_batch"} ukljucuje red na disku.
+    """
+    global _publish_limit, _max_linger_s, _urgent, _urgent_qos, _coalesce, _max_queue, _overflow
+    global _block_timeout_s, _encoding, _outbox, _outbox_drain_batch, _stats_log_s
+
+    if publish_limit is not None:
+        _publish_limit = max(1, int(publish_limit))
+    if max_linger_s is not None:
+        _max_linger_s = max(0.0, float(max_linger_s))
+    if urgent_measurements is not None:
+        _urgent = frozenset(urgent_measurements)
+    if urgent_qos is not None:
+        _urgent_qos = min(2, max(0, int(urgent_qos)))
+    if coalesce_measurements is not None:
+        events = set(coalesce_measurements) & set(NEVER_COALESCE)
+        if events:
+            log.warning("not coalescing event measurements: %s", ", ".join(sorted(events)))
+        _coalesce = frozenset(coalesce_measurements) - frozenset(NEVER_COALESCE)
+    if max_queue is not None:
+        _max_queue = max(1, int(max_queue))
+    if overflow is not None:
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow must be one of {OVERFLOW_POLICIES}, got {overflow!r}")
+        _overflow = overflow
+    if block_timeout_s is not None:
+        _block_timeout_s = max(0.0, float(block_timeout_s))
+    if encoding is not None:
+        if encoding not in ENCODINGS:
+            raise ValueError(f"encoding must be one of {ENCODINGS}, got {encoding!r}")
+        _encoding = encoding
+    if outbox is not None and outbox.get("enabled", True):
+        _outbox = Outbox(outbox.get("path", "outbox.db"), outbox.get("max_rows", 100000))
+        _outbox_drain_batch = min(MAX_TRACKED_MIDS // 2,
+                                  max(1, int(outbox.get("drain_batch", DEFAULT_OUTBOX_DRAIN_BATCH))))
+        if _outbox.backlog():
+            log.info("outbox %s: %d message(s) from previous run", _outbox.path, _outbox.backlog())
+    if stats_log_s is not None:
+        _stats_log_s = float(stats_log_s)
+
+
+def stats():
+    with g.batch_cond:
+        out = dict(_stats)
+        out["queue_depth"] = len(g.batch)
+        out["urgent_depth"] = len(g.urgent_batch)
+    out["latency"] = {lane: samples.percentiles() for lane, samples in _latency.items()}
+    if _outbox is not None:
+        out["outbox"] = _outbox.stats()
+    return out
+
+
+def _make_room(n):
+    """
+    Oslobodi mesto za n novih stavki po politici (poziva se pod g.batch_cond).
+    max_queue vazi za obe trake zajedno. Vraca broj izbacenih poruka.
+    """
+    excess = len(g.batch) + len(g.urgent_batch) + n - _max_queue
+    if excess <= 0:
+        return 0
+
+    if _overflow == "drop_telemetry":
+        # prvo najstarija telemetrija, hitna traka tek kad telemetrije nema
+        dropped = min(excess, len(g.batch))
+        del g.batch[:dropped]
+        rest = min(excess - dropped, len(g.urgent_batch))
+        del g.urgent_batch[:rest]
+        dropped += rest
+    else:
+        # najstarija poruka iz bilo koje trake (po vremenu enqueue-a)
+        dropped = 0
+        while dropped < excess and (g.batch or g.urgent_batch):
+            if g.urgent_batch and (not g.batch or g.urgent_batch[0][5] < g.batch[0][5]):
+                del g.urgent_batch[0]
+            else:
+                del g.batch[0]
+            dropped += 1
+
+    _stats["dropped"] += dropped
+    return dropped
+
+
+def _coalesce_pending(entries):
+    """
+    Nova vrednost zamenjuje poruku za isti topic koja jos ceka u redu (na
+    istom mestu u redu); vraca stavke koje treba dodati. Pod g.batch_cond.
+    """
+    pending = {e[0]: i for i, e in enumerate(g.batch) if e[6]}
+    if not pending:
+        return entries
+
+    rest = []
+    for entry in entries:
+        i = pending.get(entry[0])
+        if i is None:
+            rest.append(entry)
+        else:
+            g.batch[i] = entry
+            _stats["coalesced"] += 1
+    return rest
+
+
+def enqueue_many(items, measurement=None):
+    """
+    items: [(topic, payload, qos, retain)], ubacuju se zajedno; payload je dict
+    (serijalizuje ga publisher nit po podesenom formatu) ili gotov str/bytes.
+    Urgentni measurement-i idu u hitnu traku (odmah, QoS urgent_qos); ostalo
+    se salje kada se batch napuni ili kada najstarija poruka ceka max_linger_s.
+    Za measurement-e iz coalesce_measurements ostaje samo poslednja vrednost po topic-u.
+    Kad je red pun primenjuje se overflow politika (blokira samo "block").
+    """
+    global _oldest, _flush_now
+
+    urgent = measurement in _urgent
+    coalesce = measurement in _coalesce and not urgent
+    ts = time.time()
+    entries = [
+        (topic, payload, max(qos, _urgent_qos) if urgent else qos, retain, urgent, ts, coalesce)
+        for topic, payload, qos, retain in items
+    ]
+
+    with g.batch_cond:
+        if coalesce:
+            entries = _coalesce_pending(entries)
+
+        dropped = 0
+        if _overflow == "block":
+            deadline = time.monotonic() + _block_timeout_s
+            while len(g.batch) + len(g.urgent_batch) + len(entries) > _max_queue:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    # red i dalje pun: nove poruke se odbacuju, starije ostaju
+                    keep = max(0, _max_queue - len(g.batch) - len(g.urgent_batch))
+                    dropped = len(entries) - keep
+                    _stats["dropped"] += dropped
+                    entries = entries[:keep]
+                    break
+                g.batch_cond.wait(remaining)
+        else:
+            dropped = _make_room(len(entries))
+
+        if entries:
+            if urgent:
+                g.urgent_batch.extend(entries)
+            else:
+                if not g.batch:
+                    _oldest = time.monotonic()
+                g.batch.extend(entries)
+                if len(g.batch) >= _publish_limit:
+                    _flush_now = True
+
+            _stats["enqueued"] += len(entries)
+            g.batch_cond.notify_all()
+
+    if dropped:
+        log.warning("publisher queue full (%d), dropped %d message(s) [%s]",
+                    _max_queue, dropped, _overflow, extra={"category": "publisher.overflow"})
+
+
+def enqueue(topic, payload, measurement=None, qos=0, retain=True):
+    enqueue_many([(topic, payload, qos, retain)], measurement)
+
+
+def _on_connect(client, userdata, flags, rc):
+    global _flush_now, _connected_since
+
+    if rc == 0:
+        log.info("MQTT connected to %s:%s", HOSTNAME, PORT)
+        _connected_since = time.time()
+        _connected.set()
+        if _outbox is not None:
+            # probudi publisher da isprazni outbox i bez novih poruka
+            with g.batch_cond:
+                _flush_now = True
+                g.batch_cond.notify_all()
+    else:
+        log.warning("MQTT connect refused: rc=%s", rc)
+
+
+def _lane(urgent):
+    return _latency["urgent" if urgent else "bulk"]
+
+
+def _on_publish(client, userdata, mid):
+    now = time.time()
+    with _mid_lock:
+        sent = _inflight.pop(mid, None)
+        if sent is None:
+            _early_acks[mid] = now
+            if len(_early_acks) > MAX_TRACKED_MIDS:
+                _early_acks.pop(next(iter(_early_acks)))
+            return
+        urgent, ts, _qos, row_id = sent
+        _unsent[urgent] -= 1
+        wake = not urgent and _unsent[False] == BULK_WINDOW - 1
+        if row_id is not None:
+            _acked_rows.append(row_id)
+            wake = wake or len(_acked_rows) == 1
+
+    _lane(urgent).add((now - ts) * 1000.0)
+    if wake:
+        # publisher ceka u _wait_window ili ima redove za ack u outbox-u
+        with g.batch_cond:
+            g.batch_cond.notify_all()
 
-def publisher_task():
-    global publish_limit
 
+def _track(mid, urgent, ts, qos, row_id):
+    with _mid_lock:
+        acked = _early_acks.pop(mid, None)
+        if acked is None:
+            _inflight[mid] = (urgent, ts, qos, row_id)
+            _unsent[urgent] += 1
+            if len(_inflight) > MAX_TRACKED_MIDS:
+                old = _inflight.pop(next(iter(_inflight)))
+                _unsent[old[0]] -= 1
+            return
+        if row_id is not None:
+            _acked_rows.append(row_id)
+    _lane(urgent).add((acked - ts) * 1000.0)
+
+
+def _forget_inflight():
+    # posle prekida veze paho odbacuje neposlate QoS 0 poruke (on_publish ne
+    # dolazi, njihovi outbox redovi se salju ponovo); QoS>0 salje posle reconnect-a
+    with _mid_lock:
+        for mid in [mid for mid, sent in _inflight.items() if sent[2] == 0]:
+            urgent = _inflight.pop(mid)[0]
+            _unsent[urgent] -= 1
+        _early_acks.clear()
+
+
+def _outbox_pending():
+    # outbox redovi predati paho-u ili potvrdjeni a jos neobrisani
+    with _mid_lock:
+        pending = {sent[3] for sent in _inflight.values() if sent[3] is not None}
+        pending.update(_acked_rows)
+        return pending
+
+
+def _ack_outbox():
+    # brise redove potvrdjene preko on_publish, jednom transakcijom
+    with _mid_lock:
+        ids = _acked_rows.copy()
+        _acked_rows.clear()
+    if not ids:
+        return
+    try:
+        _outbox.ack(ids)
+    except Exception:
+        with _mid_lock:
+            _acked_rows.extend(ids)
+        raise
+
+
+def _mark_replayed(payload, age_s):
+    """
+    Poruka nastala pre poslednje konekcije (outbox backlog, requeue posle
+    prekida) dobija "replay_age_s": koliko je cekala, po satu ovog Pi-ja.
+    Controller po tome ne pusta stare dogadjaje u handler-e, bez poredjenja
+    satova dva racunara.
+    """
+    if isinstance(payload, (bytes, bytearray)):
+        if compact.is_compact(payload):
+            return compact.mark_replayed(payload, age_s)
+        payload = payload.decode()
+    text = payload.strip()
+    if not (text.startswith("{") and text.endswith("}")):
+        return payload
+    sep = "" if text[:-1].rstrip().endswith("{") else ", "
+    return f'{text[:-1]}{sep}"replay_age_s": {round(age_s, 3)}}}'
+
+
+def _send(client, topic, payload, qos, retain, urgent, ts, row_id=None):
+    if ts < _connected_since:
+        payload = _mark_replayed(payload, time.time() - ts)
+    # lock se ne drzi oko publish(): paho zove on_publish pod svojim mutex-om
+    info = client.publish(topic, payload, qos=qos, retain=retain)
+    if info.rc == mqtt.MQTT_ERR_SUCCESS or (qos > 0 and info.rc == mqtt.MQTT_ERR_NO_CONN):
+        # QoS>0 bez veze paho cuva u svom redu i salje posle reconnect-a
+        _track(info.mid, urgent, ts, qos, row_id)
+        return mqtt.MQTT_ERR_SUCCESS
+    return info.rc
+
+
+def _on_disconnect(client, userdata, rc):
+    _connected.clear()
+    _forget_inflight()
+    if rc != 0:
+        log.warning("MQTT disconnected (rc=%s), reconnecting...", rc)
+
+
+def get_client():
+    """
+    Jedan paho klijent za ceo proces: konekcija ostaje otvorena, network nit
+    (loop_start) radi reconnect, a publish() samo upisuje u socket.
+    """
+    global _client
+
+    if _client is None:
+        client = mqtt.Client()
+        client.on_connect = _on_connect
+        client.on_disconnect = _on_disconnect
+        client.on_publish = _on_publish
+        client.max_inflight_messages_set(MAX_INFLIGHT)
+        client.reconnect_delay_set(min_delay=RECONNECT_MIN_S, max_delay=RECONNECT_MAX_S)
+        client.connect_async(HOSTNAME, PORT, KEEPALIVE_S)
+        client.loop_start()
+        _client = client
+
+    return _client
+
+
+def _requeue(items):
+    # vrati na pocetak reda da redosled ostane isti i probaj ponovo;
+    # ako su u medjuvremenu stigle nove poruke, visak ide po overflow politici
+    global _oldest, _flush_now
+
+    if not items:
+        return
+
+    with g.batch_cond:
+        g.urgent_batch[:0] = [item for item in items if item[4]]
+        bulk = [item for item in items if not item[4]]
+        if bulk:
+            g.batch[:0] = bulk
+            _oldest = time.monotonic()
+            _flush_now = True
+        _stats["retried"] += len(items)
+        _make_room(0)
+        g.batch_cond.notify_all()
+
+
+def _bulk_due():
+    return _flush_now or len(g.batch) >= _publish_limit or \
+        time.monotonic() - _oldest >= _max_linger_s
+
+
+def _take_batch():
+    """
+    Ceka dok nesto ne treba poslati i vraca stavke: cela hitna traka, pa
+    telemetrija ako je njen batch spreman (inace ostaje da ceka linger).
+    """
+    global _oldest, _flush_now
+
+    with g.batch_cond:
+        while True:
+            if g.urgent_batch:
+                break
+            if g.batch:
+                if _bulk_due():
+                    break
+                g.batch_cond.wait(_oldest + _max_linger_s - time.monotonic())
+            elif _flush_now or _acked_rows:
+                # outbox: reconnect ili on_publish potvrde; vraca prazan batch,
+                # radi se ack i salje backlog
+                break
+            else:
+                g.batch_cond.wait()
+
+        items = g.urgent_batch.copy()
+        g.urgent_batch.clear()
+        if g.batch and _bulk_due():
+            items.extend(g.batch)
+            g.batch.clear()
+            _oldest = None
+        if not g.batch:
+            _flush_now = False
+        # producer-i u "block" politici cekaju na mesto u redu
+        g.batch_cond.notify_all()
+        return items
+
+
+def _wait_window():
+    """
+    Pre bulk poruke: ceka dok paho ne upise dovoljno telemetrije (BULK_WINDOW),
+    a hitne poruke koje stignu u medjuvremenu vraca da se posalju odmah.
+    """
+    with g.batch_cond:
+        while not g.urgent_batch and _unsent[False] >= BULK_WINDOW and _connected.is_set():
+            g.batch_cond.wait(0.1)
+
+        urgent = g.urgent_batch.copy()
+        g.urgent_batch.clear()
+        g.batch_cond.notify_all()
+        return urgent
+
+
+def _publish_batch(client, items):
+    """
+    Salje batch; vraca (poslato, sve_poslato). Neposlate vraca u red.
+    """
+    sent = 0
+    for i, (topic, payload, qos, retain, urgent, ts, _coalesce_item) in enumerate(items):
+        if not urgent and (g.urgent_batch or _unsent[False] >= BULK_WINDOW):
+            jump = _wait_window()
+            if jump:
+                n, ok = _publish_batch(client, jump)
+                sent += n
+                if not ok:
+                    _requeue(items[i:])
+                    return sent, False
+
+        try:
+            rc = _send(client, topic, _encode(topic, payload, ts), qos, retain, urgent, ts)
+        except Exception:
+            _requeue(items[i:])
+            raise
+        if rc != mqtt.MQTT_ERR_SUCCESS:
+            _requeue(items[i:])
+            return sent, False
+        sent += 1
+    return sent, True
+
+
+def _encode(topic, payload, ts):
+    """
+    dict -> bytes/str po podesenom formatu, sa vremenom ocitavanja ("ts") da
+    poruka poslata kasnije (outbox, prekid veze) u bazi ima pravo vreme.
+    Gotov str/bytes payload ide kako jeste.
+    """
+    if not isinstance(payload, dict):
+        return payload
+
+    if _encoding == "compact":
+        data = compact.encode(topic, payload, ts)
+        if data is not None:
+            return data
+
+    if "ts" not in payload:
+        payload = {**payload, "ts": ts}
+    return json.dumps(payload)
+
+
+def _journal(items):
+    """
+    Batch u outbox (jedna transakcija) pre slanja; ako upis ne uspe, batch
+    ostaje u memorijskom redu.
+    """
+    rows = [(ts, topic, _encode(topic, payload, ts), qos, int(retain), int(urgent))
+            for topic, payload, qos, retain, urgent, ts, _coalesce_item in items]
+    # stanja koja su jos na disku (broker nedostupan) zamenjuje nova vrednost
+    replace = {item[0] for item in items if item[6]}
+    try:
+        dropped = _outbox.append(rows, replace)
+    except Exception:
+        _requeue(items)
+        raise
+
+    if dropped:
+        with g.batch_cond:
+            _stats["dropped"] += dropped
+        log.warning("outbox full (%d), dropped %d oldest message(s)",
+                    _outbox.max_rows, dropped, extra={"category": "publisher.overflow"})
+
+
+def _retry_outbox(n):
+    # neposlati redovi ostaju na disku; _flush_now budi _take_batch i bez novih
+    # poruka (kao _requeue za memorijski red), posle backoff-a ide novi pokusaj
+    global _flush_now
+
+    with g.batch_cond:
+        _stats["retried"] += n
+        _flush_now = True
+        g.batch_cond.notify_all()
+
+
+def _drain_outbox(client):
+    """
+    Salje outbox (hitne poruke prvo). Red se brise tek kad paho javi
+    on_publish za njegov mid (QoS 0 upisan u socket, QoS 1 PUBACK), pa poruke
+    koje paho odbaci pri prekidu veze ostaju na disku; nepotvrdjenih redova
+    je najvise drain_batch. Nove hitne poruke iz memorije se upisuju u outbox
+    i salju ispred telemetrije. Vraca (poslato, sve_poslato).
+    """
+    sent = 0
     while True:
-        publish_event.wait()
+        _ack_outbox()
+        pending = _outbox_pending()
+        limit = _outbox_drain_batch - len(pending)
+        if limit <= 0:
+            # ostatak posle sledecih on_publish potvrda (bude _take_batch)
+            return sent, True
+        rows = _outbox.read_batch(limit, skip=pending)
+        if not rows:
+            return sent, True
+
+        for i, (msg_id, topic, payload, qos, retain, ts, urgent) in enumerate(rows):
+            if not urgent and (g.urgent_batch or _unsent[False] >= BULK_WINDOW):
+                jump = _wait_window()
+                if jump:
+                    # hitne poruke prvo na disk; read_batch ih vraca ispred telemetrije
+                    _journal(jump)
+                    break
+            rc = _send(client, topic, payload, qos, bool(retain), bool(urgent), ts, msg_id)
+            if rc != mqtt.MQTT_ERR_SUCCESS:
+                _retry_outbox(len(rows) - i)
+                return sent, False
+            sent += 1
+
 
-        with counter_lock:
-            local_copy = batch.copy()
-            batch.clear()
+def publisher_task():
+    """
+    Petlja ne sme da umre: greska (broker, socket, payload) vraca batch u red
+    i ceka eksponencijalni backoff pre sledeceg pokusaja.
+    """
+    backoff = ERROR_BACKOFF_MIN_S
+    last_log = time.monotonic()
+
+    while True:
+        if _stats_log_s > 0 and time.monotonic() - last_log >= _stats_log_s:
+            last_log = time.monotonic()
+            log.info("publisher stats: %s", json.dumps(stats()))
 
-        if local_copy:
-            publish.multiple(local_copy, hostname=HOSTNAME, port=PORT)
-            #print(f"[PUBLISHER] Published {len(local_copy)} values.")
+        try:
+            client = get_client()
+            items = _take_batch()
 
+            if _outbox is not None:
+                # prvo na disk, pa slanje iz outbox-a; bez veze poruke cekaju tamo
+                _journal(items)
+                _ack_outbox()
+                if not _connected.wait(CONNECT_WAIT_S):
+                    continue
+                sent, ok = _drain_outbox(client)
+            else:
+                # reconnect radi paho network nit (sa svojim backoff-om), ovde samo cekamo
+                if not _connected.wait(CONNECT_WAIT_S):
+                    _requeue(items)
+                    continue
+                sent, ok = _publish_batch(client, items)
+        except Exception:
+            with g.batch_cond:
+                _stats["errors"] += 1
+            log.exception("publisher error, retrying in %.1fs", backoff)
+            time.sleep(backoff)
+            backoff = min(backoff * 2, ERROR_BACKOFF_MAX_S)
+            continue
 
-        publish_event.clear()
+        with g.batch_cond:
+            _stats["published"] += sent
+        if ok:
+            backoff = ERROR_BACKOFF_MIN_S
+        else:
+            # veza pukla usred batch-a ili publish odbijen: ne vrti se u praznom
+            time.sleep(backoff)
+            backoff = min(backoff * 2, ERROR_BACKOFF_MAX_S)
 
 
 def start_publisher_thread():
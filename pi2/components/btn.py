@@ -1,10 +1,12 @@
-import json
+import logging
 import threading
 import queue
 
-from globals import batch, publish_limit, counter_lock, publish_event
+from publisher import enqueue
 from simulators.button import run_button_simulator
 
+log = logging.getLogger(__name__)
+
 
 class Button:
     def __init__(self, settings, verbose=False):
@@ -17,8 +19,6 @@ class Button:
         self._cmd_q = queue.Queue()
 
     def _publish(self, value: int):
-        global publish_limit
-
         self._state = 1 if int(value) else 0
 
         payload = {
@@ -31,13 +31,10 @@ class Button:
 
         topic = f"{payload['runs_on']}/{payload['name']}"
 
-        with counter_lock:
-            batch.append((topic, json.dumps(payload), 0, True))
-            if len(batch) >= publish_limit:
-                publish_event.set()
+        enqueue(topic, payload, payload["measurement"])
 
         if self.verbose:
-            print(f"[{payload['name']}] BTN={self._state}")
+            log.info("[%s] BTN=%s", payload['name'], self._state, extra={"category": payload['name']})
 
     def press(self):
         if self.simulated:
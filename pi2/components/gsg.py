@@ -1,14 +1,15 @@
-import json
 import threading
 import queue
+import time
 
 from simulators.gsg import run_gsg_simulator
-from globals import batch, publish_limit, counter_lock, publish_event
+from publisher import enqueue, enqueue_many
 from sensors.gsg import run_gsg_loop
 
 
-def _append_axis_payloads(prefix, values, settings):
+def _axis_payloads(prefix, values, settings):
     axes = ["X", "Y", "Z"]
+    items = []
     for i, axis in enumerate(axes):
         payload = {
             "measurement": f"{prefix} {axis}",
@@ -17,19 +18,114 @@ def _append_axis_payloads(prefix, values, settings):
             "name": settings["name"],
             "value": float(values[i]),
         }
-        batch.append((f"{prefix} {axis}", json.dumps(payload), 0, True))
+        items.append((f"{prefix} {axis}", payload, 0, True))
+    return items
 
 
-def gsg_callback(accel, gyro, settings):
-    global publish_limit
+def _imu_payload(samples, settings):
+    payload = {
+        "measurement": "IMU",
+        "simulated": settings.get("simulated", True),
+        "runs_on": settings["runs_on"],
+        "name": settings["name"],
+    }
+    if len(samples) == 1:
+        ts, a, g = samples[0]
+        payload["ts"] = ts
+        payload["accel"] = a
+        payload["gyro"] = g
+    else:
+        # frame: [ts, ax, ay, az, gx, gy, gz] po uzorku
+        payload["samples"] = [[ts, *a, *g] for ts, a, g in samples]
+    return payload
+
+
+class _Frame:
+    """
+    Uzorci koji cekaju da se skupi frame od `size` uzoraka. Nepun frame se
+    salje kad najstariji uzorak ceka max_age_s (threading.Timer) i kad nit
+    senzora stane, da uzorci ne ostanu zaglavljeni kad ocitavanja prestanu.
+    """
+
+    def __init__(self, size, max_age_s, send):
+        self.size = size
+        self.max_age_s = max_age_s
+        self._send = send
+        self._samples = []
+        self._timer = None
+        self._gen = 0           # tajmer starog frame-a ne sme da posalje novi
+        self._lock = threading.Lock()
+
+    def add(self, sample):
+        with self._lock:
+            self._samples.append(sample)
+            if len(self._samples) < self.size:
+                if self._timer is None:
+                    self._timer = threading.Timer(self.max_age_s, self._expire, args=(self._gen,))
+                    self._timer.daemon = True
+                    self._timer.start()
+                return
+            samples = self._take()
+        self._send(samples)
 
-    with counter_lock:
-        topic = f"{settings['runs_on']}/{settings['name']}"
-        _append_axis_payloads(f"{topic}/Accelerometer", accel, settings)
-        _append_axis_payloads(f"{topic}/Gyroscope", gyro, settings)
+    def flush(self):
+        with self._lock:
+            samples = self._take()
+        if samples:
+            self._send(samples)
 
-        if len(batch) >= publish_limit:
-            publish_event.set()
+    def _expire(self, gen):
+        with self._lock:
+            if gen != self._gen:
+                return
+            samples = self._take()
+        if samples:
+            self._send(samples)
+
+    def _take(self):
+        # pod _lock
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._gen += 1
+        samples, self._samples = self._samples, []
+        return samples
+
+
+def gsg_callback(accel, gyro, settings, frame=None):
+    """
+    format "imu" (podrazumevano): jedna poruka na <runs_on>/<name>/IMU sa svih 6 osa,
+    ili frame od frame_samples uzoraka (nepun frame posle frame_max_age_s, podrazumevano
+    frame_samples * period_s); "legacy": 6 poruka, po jedna za svaku osu.
+    """
+    topic = f"{settings['runs_on']}/{settings['name']}"
+
+    if settings.get("format", "imu") == "legacy":
+        enqueue_many(
+            _axis_payloads(f"{topic}/Accelerometer", accel, settings)
+            + _axis_payloads(f"{topic}/Gyroscope", gyro, settings)
+        )
+        return
+
+    sample = (time.time(), [float(v) for v in accel], [float(v) for v in gyro])
+    if frame is None:
+        _send_imu([sample], settings)
+    else:
+        frame.add(sample)
+
+
+def _send_imu(samples, settings):
+    topic = f"{settings['runs_on']}/{settings['name']}/IMU"
+    enqueue(topic, _imu_payload(samples, settings), "IMU")
+
+
+def _run_and_flush(target, frame, *args):
+    try:
+        target(*args)
+    finally:
+        # nit staje: posalji i nepun frame
+        if frame is not None:
+            frame.flush()
 
 
 def run_gsg(settings, threads, stop_event):
@@ -38,17 +134,26 @@ def run_gsg(settings, threads, stop_event):
 
     cmd_q = None
 
+    # uzorci koji cekaju da se skupi frame (samo sa frame_samples > 1)
+    frame_samples = int(settings.get("frame_samples", 1))
+    frame = None
+    if frame_samples > 1:
+        max_age_s = float(settings.get("frame_max_age_s", frame_samples * period_s))
+        frame = _Frame(frame_samples, max_age_s, lambda samples: _send_imu(samples, settings))
+
     if simulated:
         cmd_q = queue.Queue()
         th = threading.Thread(
-            target=run_gsg_simulator,
-            args=(cmd_q, lambda a, g: gsg_callback(a, g, settings), stop_event),
+            target=_run_and_flush,
+            args=(run_gsg_simulator, frame,
+                  cmd_q, lambda a, g: gsg_callback(a, g, settings, frame), stop_event),
             daemon=True
         )
     else:
         th = threading.Thread(
-            target=run_gsg_loop,
-            args=(period_s, gsg_callback, stop_event, settings),
+            target=_run_and_flush,
+            args=(run_gsg_loop, frame,
+                  period_s, lambda a, g, s: gsg_callback(a, g, s, frame), stop_event, settings),
             daemon=True
         )
 
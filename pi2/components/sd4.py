@@ -1,12 +1,9 @@
-import json
 import threading
 
-from globals import batch, publish_limit, counter_lock, publish_event
+from publisher import enqueue
 from simulators.sd4 import run_sd4_simulator
 
 def sd4_callback(text4, settings):
-    global publish_limit
-
     payload = {
         "measurement": "SD4",
         "simulated": settings.get("simulated", True),
@@ -16,10 +13,7 @@ def sd4_callback(text4, settings):
     }
 
     topic = f"{settings['runs_on']}/{settings['name']}"
-    with counter_lock:
-        batch.append((topic, json.dumps(payload), 0, True))
-        if len(batch) >= publish_limit:
-            publish_event.set()
+    enqueue(topic, payload, payload["measurement"])
 
 
 def run_sd4(settings, threads, stop_event):
@@ -0,0 +1,27 @@
+import threading
+from collections import deque
+
+
+class LatencySamples:
+    """
+    Poslednjih maxlen merenja (ms) za percentile u /metrics.
+    add() je O(1); sortira se samo pri citanju.
+    """
+
+    def __init__(self, maxlen=2048):
+        self._samples = deque(maxlen=int(maxlen))
+        self._lock = threading.Lock()
+
+    def add(self, ms: float):
+        with self._lock:
+            self._samples.append(ms)
+
+    def percentiles(self, ps=(50, 95, 99)) -> dict:
+        with self._lock:
+            data = sorted(self._samples)
+
+        if not data:
+            return {f"p{p}_ms": 0.0 for p in ps}
+
+        n = len(data)
+        return {f"p{p}_ms": round(data[min(n - 1, int(n * p / 100.0))], 3) for p in ps}
@@ -1,8 +1,9 @@
 import threading
 import time
 
-from publisher import start_publisher_thread
+from publisher import configure as configure_publisher, start_publisher_thread
 from settings.settings import load_settings
+from log_config import setup_logging
 
 from components.btn import Button
 from components.dht3 import run_dht3
@@ -60,6 +61,8 @@ if __name__ == "__main__":
     print("Starting PI2")
 
     settings = load_settings()
+    setup_logging(**settings.get("LOGGING", {}))
+    configure_publisher(**settings.get("PUBLISHER", {}))
     threads = []
     stop_event = threading.Event()
 
@@ -1,8 +1,9 @@
-import json
-import time
+import logging
 import threading
 
-from globals import batch, publish_limit, counter_lock, publish_event
+from publisher import enqueue
+
+log = logging.getLogger(__name__)
 
 
 class BrgbLed:
@@ -33,8 +34,6 @@ class BrgbLed:
             self.impl = RealBrgbLed(settings, on_change=self._on_color_change)
 
     def _publish_color_changed(self, color: str):
-        global publish_limit
-
         payload = {
             "measurement": "BRGB",
             "simulated": self.settings.get("simulated", True),
@@ -45,10 +44,7 @@ class BrgbLed:
         }
 
         topic = f"{self.settings['runs_on']}/{self.settings['name']}"
-        with counter_lock:
-            batch.append((topic, json.dumps(payload), 0, True))
-            if len(batch) >= publish_limit:
-                publish_event.set()
+        enqueue(topic, payload, payload["measurement"])
 
     def _on_color_change(self, color: str):
         color = str(color)
@@ -59,8 +55,8 @@ class BrgbLed:
         self._last_color = color
 
         if self.verbose:
-            ts = time.strftime("%H:%M:%S", time.localtime())
-            print(f"[{self.settings['name']}] {ts} color={color} CHANGED")
+            name = self.settings['name']
+            log.info("[%s] color=%s CHANGED", name, color, extra={"category": name})
 
         self._publish_color_changed(color)
 
@@ -1,10 +1,9 @@
-import json
 import threading
 
 from simulators.dht import run_dht_simulator
 from sensors.dht import run_dht_loop, DHT
 
-from globals import batch, publish_limit, counter_lock, publish_event
+from publisher import enqueue
 
 
 def dht_callback(humidity, temperature, settings):
@@ -26,12 +25,8 @@ def dht_callback(humidity, temperature, settings):
     }
 
     topic = f"{settings['runs_on']}/{settings['name']}"
-    with counter_lock:
-        batch.append((f"{topic}/Humidity", json.dumps(payload_h), 0, True))
-        batch.append((f"{topic}/Temperature", json.dumps(payload_t), 0, True))
-
-        if len(batch) >= publish_limit:
-            publish_event.set()
+    enqueue(f"{topic}/Humidity", payload_h, payload_h["measurement"])
+    enqueue(f"{topic}/Temperature", payload_t, payload_t["measurement"])
 
 
 
@@ -1,8 +1,10 @@
-import json
+import logging
 import time
 import threading
 
-from globals import batch, publish_limit, counter_lock, publish_event
+from publisher import enqueue
+
+log = logging.getLogger(__name__)
 
 
 class IrRemote:
@@ -32,8 +34,6 @@ class IrRemote:
             self.impl = RealIrRemote(settings, on_press=self._on_ir_press)
 
     def _publish_ir_pressed(self, button_name: str):
-        global publish_limit
-
         payload = {
             "measurement": "IR",
             "simulated": self.settings.get("simulated", True),
@@ -44,22 +44,19 @@ class IrRemote:
         }
 
         topic = f"{self.settings['runs_on']}/{self.settings['name']}"
-        with counter_lock:
-            batch.append((topic, json.dumps(payload), 0, True))
-            if len(batch) >= publish_limit:
-                publish_event.set()
+        enqueue(topic, payload, payload["measurement"])
 
     def _on_ir_press(self, button_name: str):
         button_name = str(button_name)
 
         if self._button_set and button_name not in self._button_set:
             if self.verbose:
-                print(f"[{self.settings['name']}] Ignored unknown IR button: {button_name}")
+                log.warning("[%s] Ignored unknown IR button: %s", self.settings['name'], button_name)
             return
 
         if self.verbose:
-            ts = time.strftime("%H:%M:%S", time.localtime())
-            print(f"[{self.settings['name']}] {ts} IR button={button_name} PRESSED")
+            name = self.settings['name']
+            log.info("[%s] IR button=%s PRESSED", name, button_name, extra={"category": name})
 
         self._publish_ir_pressed(button_name)
 
@@ -1,14 +1,10 @@
-import json
 import threading
-from time import time
 
-from globals import batch, publish_limit, counter_lock, publish_event
+from publisher import enqueue
 from simulators.lcd import run_lcd_simulator
 
 
 def lcd_callback(line1, line2, settings):
-    global publish_limit
-
     payload = {
         "measurement": "LCD",
         "simulated": settings.get("simulated", True),
@@ -20,10 +16,7 @@ def lcd_callback(line1, line2, settings):
     }
 
     topic = f"{settings['runs_on']}/{settings['name']}"
-    with counter_lock:
-        batch.append((topic, json.dumps(payload), 0, True))
-        if len(batch) >= publish_limit:
-            publish_event.set()
+    enqueue(topic, payload, payload["measurement"])
 
 
 def run_lcd(settings, threads, stop_event, dht_snapshot_getter=None):
@@ -1,7 +1,11 @@
 import threading
 
 batch = []
+# hitna traka (bezbednosni dogadjaji), salje se pre batch-a
+urgent_batch = []
 publish_limit = 5
 
 counter_lock = threading.Lock()
-publish_event = threading.Event()
\ No newline at end of file
+
+# publisher ceka na ovom uslovu: nova poruka, pun batch ili istek linger-a
+batch_cond = threading.Condition(counter_lock)
@@ -1,8 +1,9 @@
 import threading
 import time
 
-from publisher import start_publisher_thread
+from publisher import configure as configure_publisher, start_publisher_thread
 from settings.settings import load_settings
+from log_config import setup_logging
 
 from components.brgb import BrgbLed
 from components.ir import IrRemote
@@ -25,8 +26,11 @@ except Exception:
     pass
 
 import json
+import logging
 import paho.mqtt.client as mqtt
 
+log = logging.getLogger("pi3")
+
 
 state_lock = threading.Lock()
 pi3_state = {
@@ -91,32 +95,32 @@ def start_dht_mqtt_listener(stop_event, broker="127.0.0.1", port=1883):
     TOPIC_DHT_UPDATE = "home/actuators/dht/update"
 
     def on_connect(client, userdata, flags, rc):
-        print("DHT UPDATE MQTT CONNECTED:", rc)
+        log.info("DHT UPDATE MQTT CONNECTED: %s", rc)
         client.subscribe(TOPIC_DHT_UPDATE)
 
     def on_message(client, userdata, msg):
         try:
             payload = json.loads(msg.payload.decode())
         except Exception as e:
-            print("DHT UPDATE MQTT JSON ERROR:", e, msg.payload)
+            log.warning("DHT UPDATE MQTT JSON ERROR: %s %s", e, msg.payload)
             return
         data = payload.get("update") if isinstance(payload, dict) and "update" in payload else payload
-        print("DHT UPDATE MQTT RECEIVED:", data)
+        log.debug("DHT UPDATE MQTT RECEIVED: %s", data)
         if not isinstance(data, dict):
-            print("DHT UPDATE MQTT BAD PAYLOAD:", payload)
+            log.warning("DHT UPDATE MQTT BAD PAYLOAD: %s", payload)
             return
 
         ok = update_dht_state(data)
         if ok:
             name = data.get("name")
             snap = get_dht_snapshot().get(str(name), {})
-            print(
-                f"[DHT CACHE] {name}: "
-                f"T={snap.get('temperature')} "
-                f"H={snap.get('humidity')}"
+            log.info(
+                "[DHT CACHE] %s: T=%s H=%s",
+                name, snap.get('temperature'), snap.get('humidity'),
+                extra={"category": str(name)},
             )
         else:
-            print("DHT UPDATE MQTT ignored payload:", data)
+            log.warning("DHT UPDATE MQTT ignored payload: %s", data)
 
     def loop():
         client = mqtt.Client()
@@ -130,7 +134,7 @@ def start_dht_mqtt_listener(stop_event, broker="127.0.0.1", port=1883):
             while not stop_event.is_set():
                 time.sleep(0.1)
         except Exception as e:
-            print("DHT UPDATE MQTT LOOP ERROR:", e)
+            log.error("DHT UPDATE MQTT LOOP ERROR: %s", e)
         finally:
             try:
                 client.loop_stop()
@@ -171,6 +175,8 @@ if __name__ == "__main__":
     print("Starting PI3")
 
     settings = load_settings()
+    setup_logging(**settings.get("LOGGING", {}))
+    configure_publisher(**settings.get("PUBLISHER", {}))
     threads = []
     stop_event = threading.Event()
 
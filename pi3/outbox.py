@@ -0,0 +1,118 @@
+import sqlite3
+import threading
+
+
+class Outbox:
+    """
+    Store-and-forward red na disku (SQLite, WAL) ispod publisher-a:
+    - append() upisuje ceo batch u jednoj transakciji (group commit);
+      sa synchronous=NORMAL u WAL modu commit ne radi fsync, disk se
+      sinhronizuje tek pri checkpoint-u
+    - read_batch() vraca hitne poruke prvo, pa ostale redom (id), bez onih
+      koje su vec poslate a cekaju potvrdu (skip); ack() brise potvrdjene;
+      topic uvek pripada jednoj traci, pa je redosled po topic-u isti kao pri
+      slanju
+    - replace_topics: poruke za te topic-e koje jos cekaju se brisu pri append-u
+      (last-value-wins za stanja)
+    - max_rows: preko toga se brisu najstarije poruke
+    """
+
+    def __init__(self, path, max_rows=100000):
+        self.path = path
+        self.max_rows = int(max_rows)
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS outbox ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " ts REAL NOT NULL,"
+            " topic TEXT NOT NULL,"
+            " payload BLOB NOT NULL,"
+            " qos INTEGER NOT NULL,"
+            " retain INTEGER NOT NULL,"
+            " urgent INTEGER NOT NULL DEFAULT 0)"
+        )
+        # outbox napravljen pre uvodjenja traka
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(outbox)")}
+        if "urgent" not in columns:
+            self._db.execute("ALTER TABLE outbox ADD COLUMN urgent INTEGER NOT NULL DEFAULT 0")
+        self._db.execute("CREATE INDEX IF NOT EXISTS outbox_topic ON outbox (topic)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS outbox_lane ON outbox (urgent DESC, id)")
+
+        self._count = self._db.execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+        self._stats = {"journaled": 0, "acked": 0, "coalesced": 0, "dropped": 0, "commits": 0}
+
+    def append(self, rows, replace_topics=()):
+        """
+        rows: [(ts, topic, payload, qos, retain, urgent)]; vraca broj izbacenih (max_rows).
+        """
+        if not rows:
+            return 0
+
+        with self._lock:
+            with self._db:
+                self._db.execute("BEGIN")
+                coalesced = 0
+                if replace_topics:
+                    coalesced = self._db.executemany(
+                        "DELETE FROM outbox WHERE topic = ?", [(t,) for t in replace_topics]
+                    ).rowcount
+                self._db.executemany(
+                    "INSERT INTO outbox (ts, topic, payload, qos, retain, urgent) VALUES (?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+
+                dropped = max(0, self._count - coalesced + len(rows) - self.max_rows)
+                if dropped:
+                    self._db.execute(
+                        "DELETE FROM outbox WHERE id IN (SELECT id FROM outbox ORDER BY id LIMIT ?)",
+                        (dropped,),
+                    )
+
+            self._count += len(rows) - coalesced - dropped
+            self._stats["journaled"] += len(rows)
+            self._stats["coalesced"] += coalesced
+            self._stats["dropped"] += dropped
+            self._stats["commits"] += 1
+            return dropped
+
+    def read_batch(self, limit, skip=()):
+        """
+        Sledecih `limit` poruka (hitne prvo) osim id-jeva iz skip:
+        [(id, topic, payload, qos, retain, ts, urgent)].
+        """
+        skip = set(skip)
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id, topic, payload, qos, retain, ts, urgent FROM outbox"
+                " ORDER BY urgent DESC, id LIMIT ?",
+                (int(limit) + len(skip),),
+            ).fetchall()
+        return [row for row in rows if row[0] not in skip][:int(limit)]
+
+    def ack(self, ids):
+        """
+        Brise potvrdjene poruke (id-jevi iz read_batch).
+        """
+        with self._lock:
+            with self._db:
+                self._db.execute("BEGIN")
+                n = self._db.executemany("DELETE FROM outbox WHERE id = ?", [(i,) for i in ids]).rowcount
+            self._count -= n
+            self._stats["acked"] += n
+            self._stats["commits"] += 1
+
+    def backlog(self) -> int:
+        with self._lock:
+            return self._count
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._stats, "backlog": self._count, "path": self.path}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
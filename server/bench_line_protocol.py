@@ -0,0 +1,108 @@
+"""
+Benchmark: influxdb_client.Point vs LineProtocolEncoder za senzorske poruke.
+
+    python bench_line_protocol.py [broj_tacaka]
+"""
+import random
+import sys
+import time
+
+from influxdb_client import Point, WritePrecision
+
+from line_protocol import LineProtocolEncoder
+
+
+DEVICES = [
+    ("Distance", "PI1", "DUS1"),
+    ("Distance", "PI2", "DUS2"),
+    ("Button", "PI1", "DS1"),
+    ("Motion", "PI2", "DPIR2"),
+    ("DHTHumidity", "PI3", "DHT1"),
+    ("DHTTemperature", "PI3", "DHT1"),
+    ("PI2/GSG/Accelerometer X", "PI2", "GSG"),
+    ("SD4", "PI2", "SD4"),
+    ("IR", "PI3", "IR"),
+]
+
+
+def make_payloads(n: int):
+    rnd = random.Random(42)
+    out = []
+    for _ in range(n):
+        measurement, runs_on, name = rnd.choice(DEVICES)
+        if measurement in ("Button", "Motion"):
+            value = rnd.randint(0, 1)
+        elif measurement == "SD4":
+            value = f"{rnd.randint(0, 99):02d}:{rnd.randint(0, 59):02d}"
+        elif measurement == "IR":
+            value = rnd.choice(["OK", "LEFT", "RIGHT", "1", "2"])
+        else:
+            value = round(rnd.uniform(0, 200), 2)
+        out.append({
+            "measurement": measurement,
+            "simulated": True,
+            "runs_on": runs_on,
+            "name": name,
+            "value": value,
+        })
+    return out
+
+
+def point_path(data: dict, ts_ns: int) -> str:
+    # isto kao stari save_to_db
+    measurement = str(data["measurement"])
+    name = str(data.get("name", ""))
+
+    point = (
+        Point(measurement)
+        .tag("simulated", str(data.get("simulated", True)))
+        .tag("runs_on", str(data.get("runs_on", "")))
+        .tag("name", name)
+        .time(ts_ns, WritePrecision.NS)
+    )
+
+    value = data.get("value", None)
+    if measurement == "IR" or name == "IR":
+        point = point.field("value_text", "" if value is None else str(value))
+    elif isinstance(value, (bool, int, float)):
+        point = point.field("value", value)
+    else:
+        try:
+            point = point.field("value", float(value))
+        except Exception:
+            point = point.field("value_text", str(value))
+
+    return point.to_line_protocol()
+
+
+def run(label, fn, payloads):
+    ts = time.time_ns()
+    t0 = time.perf_counter()
+    for i, data in enumerate(payloads):
+        fn(data, ts + i)
+    dt = time.perf_counter() - t0
+    print(f"{label:<12} {len(payloads):>8} points  {dt * 1000:9.1f} ms  {len(payloads) / dt:12.0f} points/s")
+    return dt
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    payloads = make_payloads(n)
+    encoder = LineProtocolEncoder()
+
+    # provera da obe putanje daju isti line protocol
+    ts = time.time_ns()
+    for data in payloads[:200]:
+        a = point_path(data, ts)
+        b = encoder.encode(data, ts)
+        if a != b:
+            print("MISMATCH:\n  point:  ", a, "\n  encoder:", b)
+            break
+
+    t_point = run("Point", point_path, payloads)
+    t_enc = run("encoder", encoder.encode, payloads)
+    print(f"speedup: {t_point / t_enc:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+"""
+Kompaktni binarni format Pi poruka, alternativa JSON-u (bira se po Pi-ju u
+settings.json, "PUBLISHER": {"encoding": "compact"}). Controller prepoznaje
+format po prvom bajtu, JSON poruka uvek pocinje sa "{".
+
+    MAGIC    1 bajt (0xC1)
+    flags    1 bajt: bit0 simulated, bit1 ts, bit2 uredjaj u poruci, bit3-5 tip
+             vrednosti, bit6 replay_age_s na kraju poruke
+    kod      1 bajt: indeks u MEASUREMENTS, 0 = ime measurement-a sledi kao str
+    [str]    measurement (samo za kod 0)
+    [str]    runs_on, [str] name (samo sa bit2; inace iz topic-a "<runs_on>/<name>/...")
+    [d]      ts (samo sa bit1)
+    vrednost po tipu: int je zigzag varint, f32 se pri citanju zaokruzuje na 7
+             cifara, tekst je uint16 duzina + utf-8, IMU je uint16 broj uzoraka,
+             "<d" ts prvog uzorka, pa po uzorku "<I6f" (ms od prvog, ax..gz)
+    [f]      replay_age_s (samo sa bit6): poruka poslata posle prekida veze,
+             koliko je cekala na Pi-ju; mark_replayed() ga dopisuje na gotovu poruku
+
+str je uint8 duzina + utf-8. Poruke koje ne staju u format (dodatna polja,
+nepoznat tip vrednosti) encode() vraca kao None i salju se kao JSON.
+"""
+import struct
+
+MAGIC = 0xC1
+
+# indeks je kod u poruci; tabela se samo dopunjuje na kraju (stari Pi-jevi i
+# novi controller moraju da se razumeju)
+MEASUREMENTS = (
+    None, "Button", "Motion", "DMS", "BuzzerState", "LightState", "Distance",
+    "DHTHumidity", "DHTTemperature", "SD4", "LCD", "IR", "BRGB", "IMU",
+)
+_CODES = {m: i for i, m in enumerate(MEASUREMENTS) if m}
+
+_SIMULATED = 0x01
+_HAS_TS = 0x02
+_DEVICE = 0x04
+_TYPE_SHIFT = 3
+_REPLAYED = 0x40
+
+T_NONE, T_FALSE, T_TRUE, T_INT, T_F32, T_F64, T_STR, T_IMU = range(8)
+
+_FIELDS = frozenset(("measurement", "simulated", "runs_on", "name", "value", "ts", "replay_age_s"))
+_IMU_FIELDS = frozenset(("measurement", "simulated", "runs_on", "name", "ts", "accel", "gyro", "samples",
+                         "replay_age_s"))
+
+_HEAD = struct.Struct("<BBB")
+_D = struct.Struct("<d")
+_F = struct.Struct("<f")
+_H = struct.Struct("<H")
+_SAMPLE = struct.Struct("<I6f")
+
+
+def is_compact(payload: bytes) -> bool:
+    return len(payload) > 0 and payload[0] == MAGIC
+
+
+def _f32(x: float) -> float:
+    # f32 nosi ~7 cifara; bez ovoga bi 23.4 stiglo kao 23.399999618530273
+    return float(f"{x:.7g}")
+
+
+def _str8(s: str) -> bytes:
+    b = s.encode()
+    if len(b) > 255:
+        raise ValueError("string too long")
+    return bytes((len(b),)) + b
+
+
+def _varint(n: int) -> bytes:
+    n = (n << 1) ^ (n >> 63)        # zigzag
+    if n >> 64:
+        raise ValueError("int out of range")
+    out = bytearray()
+    while n > 0x7F:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+    return bytes(out)
+
+
+def _encode_value(value):
+    if value is None:
+        return T_NONE, b""
+    if value is True:
+        return T_TRUE, b""
+    if value is False:
+        return T_FALSE, b""
+    if isinstance(value, int):
+        return T_INT, _varint(value)
+    if isinstance(value, float):
+        try:
+            packed = _F.pack(value)
+            if _f32(_F.unpack(packed)[0]) == value:
+                return T_F32, packed
+        except OverflowError:
+            pass
+        return T_F64, _D.pack(value)
+    if isinstance(value, str):
+        b = value.encode()
+        if len(b) > 0xFFFF:
+            raise ValueError("string too long")
+        return T_STR, _H.pack(len(b)) + b
+    raise ValueError(f"unsupported value type: {type(value).__name__}")
+
+
+def _imu_samples(data: dict):
+    samples = data.get("samples")
+    if samples is None:
+        samples = [[data.get("ts"), *data["accel"], *data["gyro"]]]
+    if len(samples) > 0xFFFF:
+        raise ValueError("too many samples")
+
+    base = float(samples[0][0]) if samples else 0.0
+    out = [_H.pack(len(samples)), _D.pack(base)]
+    for s in samples:
+        out.append(_SAMPLE.pack(round((s[0] - base) * 1000), *s[1:]))
+    return b"".join(out)
+
+
+def encode(topic: str, data: dict, ts=None):
+    """
+    Poruka (isti dict kao za JSON) -> bytes, ili None ako ne moze u kompaktni
+    format. ts se upisuje ako poruka nema svoj "ts".
+    """
+    measurement = data.get("measurement")
+    if measurement is None:
+        return None
+
+    imu = measurement == "IMU" and ("samples" in data or "accel" in data)
+    if not (_IMU_FIELDS if imu else _FIELDS).issuperset(data):
+        return None
+
+    runs_on = str(data.get("runs_on", ""))
+    name = str(data.get("name", ""))
+    ts = data.get("ts", ts)
+
+    try:
+        if imu:
+            vtype, value = T_IMU, _imu_samples(data)
+            ts = None
+        else:
+            vtype, value = _encode_value(data.get("value"))
+
+        flags = vtype << _TYPE_SHIFT
+        if data.get("simulated", True):
+            flags |= _SIMULATED
+
+        parts = []
+        code = _CODES.get(measurement, 0)
+        if code == 0:
+            parts.append(_str8(str(measurement)))
+
+        if topic.split("/", 2)[:2] != [runs_on, name]:
+            flags |= _DEVICE
+            parts.append(_str8(runs_on))
+            parts.append(_str8(name))
+
+        if ts is not None:
+            flags |= _HAS_TS
+            parts.append(_D.pack(float(ts)))
+
+        if "replay_age_s" in data:
+            flags |= _REPLAYED
+            value += _F.pack(float(data["replay_age_s"]))
+    except (ValueError, TypeError, KeyError, struct.error):
+        return None
+
+    return _HEAD.pack(MAGIC, flags, code) + b"".join(parts) + value
+
+
+def mark_replayed(payload: bytes, age_s: float) -> bytes:
+    """
+    Gotova kompaktna poruka -> ista poruka sa replay_age_s (bez ponovnog
+    kodiranja); poruka koja ga vec ima dobija novu vrednost.
+    """
+    if payload[1] & _REPLAYED:
+        payload = payload[:-_F.size]
+    return bytes((payload[0], payload[1] | _REPLAYED)) + payload[2:] + _F.pack(float(age_s))
+
+
+class _Reader:
+    __slots__ = ("buf", "pos")
+
+    def __init__(self, buf):
+        self.buf = buf
+        self.pos = 0
+
+    def take(self, n):
+        end = self.pos + n
+        if end > len(self.buf):
+            raise ValueError("truncated compact payload")
+        b = self.buf[self.pos:end]
+        self.pos = end
+        return b
+
+    def unpack(self, st):
+        return st.unpack(self.take(st.size))
+
+    def str8(self):
+        return self.take(self.take(1)[0]).decode()
+
+    def varint(self):
+        n = shift = 0
+        while True:
+            b = self.take(1)[0]
+            n |= (b & 0x7F) << shift
+            if not b & 0x80:
+                return (n >> 1) ^ -(n & 1)
+            shift += 7
+
+
+def decode(topic: str, payload: bytes) -> dict:
+    """
+    Kompaktna poruka -> dict u istom obliku kao JSON poruka (IMU uvek kao
+    frame "samples"). Neispravna poruka -> ValueError.
+    """
+    r = _Reader(payload)
+    magic, flags, code = r.unpack(_HEAD)
+    if magic != MAGIC:
+        raise ValueError("not a compact payload")
+
+    if code == 0:
+        measurement = r.str8()
+    elif code < len(MEASUREMENTS):
+        measurement = MEASUREMENTS[code]
+    else:
+        raise ValueError(f"unknown measurement code {code}")
+
+    if flags & _DEVICE:
+        runs_on = r.str8()
+        name = r.str8()
+    else:
+        parts = topic.split("/", 2)
+        if len(parts) < 2:
+            raise ValueError(f"no device in topic {topic!r}")
+        runs_on, name = parts[0], parts[1]
+
+    data = {
+        "measurement": measurement,
+        "simulated": bool(flags & _SIMULATED),
+        "runs_on": runs_on,
+        "name": name,
+    }
+    if flags & _HAS_TS:
+        data["ts"] = r.unpack(_D)[0]
+
+    vtype = (flags >> _TYPE_SHIFT) & 0x07
+    if vtype == T_IMU:
+        (n,) = r.unpack(_H)
+        (base,) = r.unpack(_D)
+        data["samples"] = [
+            [base + s[0] / 1000.0, *(_f32(v) for v in s[1:])]
+            for s in (r.unpack(_SAMPLE) for _ in range(n))
+        ]
+    elif vtype == T_NONE:
+        data["value"] = None
+    elif vtype == T_FALSE:
+        data["value"] = False
+    elif vtype == T_TRUE:
+        data["value"] = True
+    elif vtype == T_INT:
+        data["value"] = r.varint()
+    elif vtype == T_F32:
+        data["value"] = _f32(r.unpack(_F)[0])
+    elif vtype == T_F64:
+        data["value"] = r.unpack(_D)[0]
+    else:
+        (n,) = r.unpack(_H)
+        data["value"] = r.take(n).decode()
+
+    if flags & _REPLAYED:
+        data["replay_age_s"] = _f32(r.unpack(_F)[0])
+
+    return data
@@ -1,12 +1,29 @@
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request
 from flask_cors import CORS
-from influxdb_client import InfluxDBClient, Point
-from influxdb_client.client.write_api import SYNCHRONOUS
+from influxdb_client import InfluxDBClient
 import paho.mqtt.client as mqtt
 import json
+import logging
 import threading
 import time
 import math
+import os
+
+from influx_writer import InfluxBatchWriter
+from spill_log import SpillLog
+from worker_pool import ShardedWorkerPool
+from time_window import TimeWindow
+from timers import TimerScheduler
+from topic_router import TopicRouter
+from line_protocol import LineProtocolEncoder
+from log_config import setup_logging
+from state import DoorsState, OccupancyState, AlarmState, ImuState, LightsState, SnapshotStore, StatusCache
+from push_hub import PushHub
+from timeseries import TimeseriesService, QueryError
+from rollup import RollupStore
+from deadband import DeadbandFilter
+from compact import decode as decode_compact, is_compact
+from imu import AXES, is_imu_payload, iter_imu_samples, legacy_readings
 
 app = Flask(__name__)
 CORS(
@@ -16,6 +33,25 @@ CORS(
 )
 
 
+# -----------------------------
+# Logging
+# -----------------------------
+# nivo po modulu; env LOG_LEVEL / LOG_LEVELS="controller.mqtt=DEBUG" ima prednost
+LOG_LEVEL = "INFO"
+LOG_LEVELS = {
+    "controller.mqtt": "INFO",
+}
+LOG_RATE_PER_S = 5.0    # po kategoriji (npr. po senzoru / temi)
+LOG_BURST = 20
+
+setup_logging(level=LOG_LEVEL, levels=LOG_LEVELS, rate_per_s=LOG_RATE_PER_S, burst=LOG_BURST)
+
+log = logging.getLogger("controller")
+mqtt_log = logging.getLogger("controller.mqtt")
+alarm_log = logging.getLogger("controller.alarm")
+sensor_log = logging.getLogger("controller.sensors")
+
+
 # -----------------------------
 # InfluxDB Configuration
 # -----------------------------
@@ -26,6 +62,33 @@ bucket = "iot-db"
 
 influxdb_client = InfluxDBClient(url=url, token=token, org=org)
 
+INFLUX_BATCH_SIZE = 500
+INFLUX_MAX_LINGER_S = 0.5
+INFLUX_MAX_QUEUE = 50000
+
+# spill na disk dok je Influx nedostupan (fsync: always | interval | never)
+SPILL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "spill")
+SPILL_SEGMENT_BYTES = 8 << 20
+SPILL_MAX_BYTES = 256 << 20
+SPILL_FSYNC = "interval"
+INFLUX_RETRY_S = 5.0
+INFLUX_REPLAY_BATCH_SIZE = 5000
+
+influx_writer = InfluxBatchWriter(
+    influxdb_client,
+    bucket=bucket,
+    org=org,
+    batch_size=INFLUX_BATCH_SIZE,
+    max_linger_s=INFLUX_MAX_LINGER_S,
+    max_queue=INFLUX_MAX_QUEUE,
+    spill=SpillLog(SPILL_DIR, segment_bytes=SPILL_SEGMENT_BYTES, max_bytes=SPILL_MAX_BYTES, fsync=SPILL_FSYNC),
+    retry_s=INFLUX_RETRY_S,
+    replay_batch_size=INFLUX_REPLAY_BATCH_SIZE,
+)
+influx_writer.start()
+
+line_encoder = LineProtocolEncoder()
+
 # -----------------------------
 # MQTT topics (komande aktuatorima)
 # -----------------------------
@@ -34,16 +97,91 @@ TOPIC_DB_CMD  = "home/actuators/db/cmd"
 TOPIC_DHT_UPDATE  = "home/actuators/dht/update"
 
 DS_UNLOCKED_SECONDS = 5.0
+DL1_ON_SECONDS = 10.0
 ALARM_HOLD_S = 10.0         
 GSG_COOLDOWN_S = 2.0        
 GSG_ACCEL_DELTA_THR = 0.25   
 GSG_GYRO_NORM_THR = 80.0  
 EMPTY_GRACE_S = 4.0 
 
-lock = threading.Lock()
+# obrada MQTT poruka van paho mrezne niti
+WORKER_COUNT = 4
+WORKER_QUEUE_SIZE = 10000
+# pun red: dogadjaji (vrata, pokret, tasteri ...) cekaju mesto, ne izbacuju se;
+# samo telemetrija velike frekvencije odbacuje novu poruku (drop_newest ne dira
+# dogadjaje koji vec cekaju u istom shard-u, za razliku od drop_oldest)
+WORKER_BACKPRESSURE = "block"          # block | drop_newest | drop_oldest
+WORKER_BULK_BACKPRESSURE = "drop_newest"
+WORKER_BULK_DEVICES = ("GSG", "DHT")   # prefiksi imena uredjaja
+
+# senzori istih vrata idu u isti shard (DPIR cita DUS istoriju istih vrata, pa
+# redosled DUS -> DPIR mora da ostane); ostali uredjaji se rasporedjuju po imenu
+WORKER_SHARD_GROUPS = {
+    "DS1": "door1", "DUS1": "door1", "DPIR1": "door1",
+    "DS2": "door2", "DUS2": "door2", "DPIR2": "door2",
+}
+
+# poruka koju Pi salje posle prekida veze nosi "replay_age_s" (koliko je cekala,
+# po satu Pi-ja); starija od ovoga se samo upisuje u bazu, ne ide u handler-e,
+# da stari dogadjaji ne pale svetlo/alarm sada
+STALE_READING_S = 10.0
+
+# Pi nema RTC: zivoj poruci ciji se "ts" razlikuje od sata controller-a vise od
+# ovoga se samo loguje upozorenje (najvise jednom u CLOCK_SKEW_LOG_S po Pi-ju)
+CLOCK_SKEW_WARN_S = 10.0
+CLOCK_SKEW_LOG_S = 60.0
+
+# poslednje DUS distance po senzoru (za ULAZAK/IZLAZAK bez upita ka bazi)
+DUS_INFER_LOOKBACK_S = 15
+DUS_HISTORY_WINDOW_S = 20.0
+
+# koliko poslednjih verzija /status odgovora se pamti za ?since= delta
+STATUS_HISTORY = 64
+
+# SSE /events: broj klijenata, koliko razlicitih dogadjaja ceka po klijentu, keepalive
+PUSH_MAX_CLIENTS = 32
+PUSH_MAX_PENDING = 256
+PUSH_KEEPALIVE_S = 15.0
+
+# /timeseries kes rezultata (kljuc = normalizovani parametri)
+TIMESERIES_CACHE_SIZE = 256
+TIMESERIES_CACHE_TTL_S = 5.0
+
+# agregati u memoriji po (senzor, merenje): poslednji minut / sat / dan
+ROLLUP_MAX_SERIES = 256
+
+rollups = RollupStore(max_series=ROLLUP_MAX_SERIES)
+
+# upis u bazu samo kada se vrednost dovoljno promeni (ili posle heartbeat-a);
+# dogadjaji (Button, Motion, DMS, IR, ...) nemaju pravilo i uvek se upisuju
+PERSIST_HEARTBEAT_S = 60.0
+PERSIST_FILTER_RULES = {
+    "DHTHumidity": {"abs": 0.5},
+    "DHTTemperature": {"abs": 0.1},
+    "Distance": {"abs": 1.0},
+    "GSG": {"abs": 0.02, "heartbeat_s": 30.0},
+    "SD4": {},
+    "LCD": {},
+    "LightState": {},
+    "BuzzerState": {},
+}
+
+persist_filter = DeadbandFilter(PERSIST_FILTER_RULES, heartbeat_s=PERSIST_HEARTBEAT_S)
+
+dus_history = {
+    "DUS1": TimeWindow(DUS_HISTORY_WINDOW_S),
+    "DUS2": TimeWindow(DUS_HISTORY_WINDOW_S),
+}
+
+ALARM_SOURCES = ("ds_unlocked", "motion_empty", "gsg_move")
 
-state = {
-    "people_count": 0,
+doors = DoorsState(("DS1", "DS2"))
+occupancy = OccupancyState()
+alarm = AlarmState(ALARM_SOURCES)
+imu = ImuState()
+lights = LightsState()
+
+store = SnapshotStore({
     "sensors": {
         "DPIR1": 0,
         "DUS1": None,
@@ -52,75 +190,95 @@ state = {
         "DPIR3": 0,
         "GSG": None,
     },
-    "dus_history": {
-        "DUS1": [],
-        "DUS2": [],
-    },
-    "alarm_sources": {
-        "ds_unlocked": {"active": False, "reason": ""},
-        "motion_empty": {"active": False, "reason": ""},
-        "gsg_move": {"active": False, "reason": ""},
+    "dus": {
+        name: {"last_5": [], "stats": w.stats()} for name, w in dus_history.items()
     },
+    "doors": doors.snapshot(),
+    "occupancy": occupancy.snapshot(),
+    "alarm": alarm.snapshot(),
+    "imu": imu.snapshot(),
+    "lights": lights.snapshot(),
+})
 
-    "gsg": {
-        "accel": {"x": None, "y": None, "z": None},
-        "gyro":  {"x": None, "y": None, "z": None},
-        "last_trigger": 0.0,
-    },
 
-    "dl1_on": False,
-    "dl1_until": 0.0,
+# alarm helper
 
-    "alarm_on": False,
-    "alarm_reason": "",
-    "alarm_reasons": [],
-    "ds": {
-        "DS1": {"value": 0, "since": None, "alarm_latched": False},
-        "DS2": {"value": 0, "since": None, "alarm_latched": False},
-    },
-    "empty_grace_until": 0.0,
-}
+def _set_alarm_source(key: str, active: bool, reason: str = ""):
+    with alarm.lock:
+        src = alarm.sources[key]
+        src.active = active
+        src.reason = reason
 
+        desired = alarm.recompute()
+        store.publish("alarm", alarm.snapshot())
 
-# alarm helper
+        # slanje pod lock-om cuva redosled ON/OFF komandi
+        if desired is not None:
+            mqtt_send(TOPIC_DB_CMD, {"command": "ON" if desired else "OFF", "reason": alarm.reason})
+            alarm_log.info("%s reasons=%s", "ON" if desired else "OFF", alarm.reasons)
 
-def _recompute_alarm(now: float):
-    desired = (
-        state["alarm_sources"]["ds_unlocked"]["active"]
-        or state["alarm_sources"]["motion_empty"]["active"]
-        or state["alarm_sources"]["gsg_move"]["active"]
-    )
 
-    reasons = []
-    for k in ("ds_unlocked", "motion_empty", "gsg_move"):
-        src = state["alarm_sources"][k]
-        if src.get("active"):
-            reasons.append(src.get("reason") or k)
+def alarm_pulse(source_key: str, hold_s: float, reason: str):
+    _set_alarm_source("gsg_move", True, "GSG significant movement")
 
-    state["alarm_reasons"] = reasons
-    state["alarm_reason"] = "; ".join(reasons)
 
-    current = bool(state.get("alarm_on", False))
-    if desired == current:
-        return
+# -----------------------------
+# Timers (one-shot, umesto 100 ms petlje)
+# -----------------------------
+timers = TimerScheduler()
+timers.start()
 
-    state["alarm_on"] = desired
 
-    reasons = []
-    for k in ("ds_unlocked", "motion_empty", "gsg_move"):
-        if state["alarm_sources"][k]["active"]:
-            reasons.append(state["alarm_sources"][k].get("reason", k))
+def _refresh_ds_alarm_source():
+    # poziva se pod doors.lock
+    ds_reason = ""
+    for ds_name, d in doors.doors.items():
+        if d.alarm_latched:
+            ds_reason = f"{ds_name} open > {DS_UNLOCKED_SECONDS}s"
+            break
 
-    mqtt_send(TOPIC_DB_CMD, {"command": "ON" if desired else "OFF", "reason": "; ".join(reasons)})
-    print(f"[ALARM] {'ON' if desired else 'OFF'} reasons={reasons}")
+    _set_alarm_source("ds_unlocked", bool(ds_reason), ds_reason)
 
 
-def alarm_pulse(source_key: str, hold_s: float, reason: str):
-    now = time.time()
-    with lock:
-        state["alarm_sources"]["gsg_move"]["active"] = True
-        state["alarm_sources"]["gsg_move"]["reason"] = "GSG significant movement"
-        _recompute_alarm(time.time())
+def _arm_ds_timer(ds_name: str, since: float):
+    timers.call_at(f"ds_unlocked:{ds_name}", since + DS_UNLOCKED_SECONDS, lambda: _on_ds_unlocked_timeout(ds_name))
+
+
+def _on_ds_unlocked_timeout(ds_name: str):
+    with doors.lock:
+        d = doors.doors[ds_name]
+
+        # 0 open
+        if d.value != 0 or d.since is None:
+            return
+
+        d.alarm_latched = True
+        store.publish("doors", doors.snapshot())
+        _refresh_ds_alarm_source()
+
+
+def _on_dl1_timeout():
+    with lights.lock:
+        if not lights.dl1_on:
+            return
+        lights.dl1_on = False
+        lights.dl1_until = 0.0
+        store.publish("lights", lights.snapshot())
+
+    mqtt_send(TOPIC_DL1_CMD, {"command": "OFF"})
+    log.info("[DL1] OFF (timeout)")
+
+
+def _on_gsg_cooldown_end():
+    with imu.lock:
+        imu.cooldown = False
+        store.publish("imu", imu.snapshot())
+
+
+def _on_empty_grace_end():
+    with occupancy.lock:
+        occupancy.empty_grace_until = 0.0
+        store.publish("occupancy", occupancy.snapshot())
 
 # -----------------------------
 # Server helper functions
@@ -128,83 +286,33 @@ def alarm_pulse(source_key: str, hold_s: float, reason: str):
 def mqtt_send(topic, payload: dict):
     try:
         mqtt_client.publish(topic, json.dumps(payload))
-        print("MQTT SEND:", topic, payload)
+        mqtt_log.info("SEND %s %s", topic, payload, extra={"category": topic})
     except Exception as e:
-        print("MQTT SEND ERROR:", e)
-def save_to_db(data):
+        mqtt_log.error("SEND ERROR: %s", e)
+def save_to_db(data, ts=None):
     try:
-        if "measurement" not in data:
+        # timestamp se postavlja pri prijemu (ili iz uzorka), ne pri upisu batch-a
+        ts_ns = time.time_ns() if ts is None else int(ts * 1e9)
+        line = line_encoder.encode(data, ts_ns)
+        if line is None:
             return
 
-        measurement = str(data["measurement"])
-        name = str(data.get("name", ""))
-
-        point = (
-            Point(measurement)
-            .tag("simulated", str(data.get("simulated", True)))
-            .tag("runs_on", str(data.get("runs_on", "")))
-            .tag("name", name)
-        )
-
-        value = data.get("value", None)
-
-        if measurement == "IR" or name == "IR":
-            point = point.field("value_text", "" if value is None else str(value))
-        else:
-            if isinstance(value, bool):
-                point = point.field("value", value)
-            elif isinstance(value, (int, float)):
-                point = point.field("value", value)
-            else:
-                try:
-                    point = point.field("value", float(value))
-                except Exception:
-                    point = point.field("value_text", str(value))
-
-        write_api = influxdb_client.write_api(write_options=SYNCHRONOUS)
-        write_api.write(bucket=bucket, org=org, record=point)
+        influx_writer.write(line)
 
     except Exception as e:
-        print("INFLUX SAVE ERROR:", e)
+        log.error("INFLUX SAVE ERROR: %s", e)
 
 def is_empty_but_in_grace(now: float) -> bool:
-    return int(state.get("people_count", 0)) == 0 and now < float(state.get("empty_grace_until", 0.0))
-
-def get_last_dus_values_from_db(dus_name: str, runs_on: str, n=3, lookback_s=15):
-    try:
-        query_api = influxdb_client.query_api()
-        flux = f'''
-from(bucket: "{bucket}")
-  |> range(start: -{int(lookback_s)}s)
-  |> filter(fn: (r) => r._measurement == "Distance")
-  |> filter(fn: (r) => r.name == "{dus_name}")
-  |> filter(fn: (r) => r.runs_on == "{runs_on}")
-  |> filter(fn: (r) => r._field == "value")
-  |> sort(columns: ["_time"], desc: false)
-  |> tail(n: {int(n)})
-'''
-        tables = query_api.query(flux, org=org)
-        values = []
-        for table in tables:
-            for record in table.records:
-                try:
-                    values.append(float(record.get_value()))
-                except Exception:
-                    pass
-        return values
-    except Exception as e:
-        print("INFLUX QUERY ERROR:", e)
-        return []
-
+    occ = store.current["occupancy"]
+    return int(occ["people_count"]) == 0 and now < float(occ["empty_grace_until"])
 
-def infer_entry_exit_from_dus(dus_name: str, runs_on: str):
-    values = get_last_dus_values_from_db(dus_name=dus_name, runs_on=runs_on, n=3, lookback_s=15)
+def infer_entry_exit_from_dus(dus_name: str):
+    hist = dus_history.get(dus_name)
+    if hist is None:
+        return (None, False)
 
-    if len(values) < 3:
-        with lock:
-            hist = state["dus_history"].get(dus_name, [])
-            if len(hist) >= 3:
-                values = [float(x) for _, x in hist[-3:]]
+    cutoff = time.time() - DUS_INFER_LOOKBACK_S
+    values = [v for t, v in hist.last(3) if t >= cutoff]
 
     if len(values) < 3:
         return (None, False)
@@ -217,15 +325,15 @@ def infer_entry_exit_from_dus(dus_name: str, runs_on: str):
 
     exit_from_zero = False
 
-    with lock:
-        before = int(state.get("people_count", 0))
+    with occupancy.lock:
+        before = occupancy.people_count
 
         if descending:
-            state["people_count"] = before + 1
+            occupancy.people_count = before + 1
             direction = "ULAZAK"
 
-            state["alarm_sources"]["motion_empty"]["active"] = False
-            state["alarm_sources"]["motion_empty"]["reason"] = ""
+            occupancy.empty_grace_until = 0.0
+            timers.cancel("empty_grace")
 
         elif ascending:
             direction = "IZLAZAK"
@@ -233,71 +341,40 @@ def infer_entry_exit_from_dus(dus_name: str, runs_on: str):
             if before == 0:
                 exit_from_zero = True
             else:
-                state["people_count"] = before - 1
-
-            state["alarm_sources"]["motion_empty"]["active"] = False
-            state["alarm_sources"]["motion_empty"]["reason"] = ""
+                occupancy.people_count = before - 1
 
-            after = int(state.get("people_count", 0))
-            if after == 0 and before > 0:
-                state["empty_grace_until"] = time.time() + EMPTY_GRACE_S
+            if occupancy.people_count == 0 and before > 0:
+                occupancy.empty_grace_until = time.time() + EMPTY_GRACE_S
+                timers.call_at("empty_grace", occupancy.empty_grace_until, _on_empty_grace_end)
 
         else:
             direction = "NEJASNO"
 
-        after = int(state.get("people_count", 0))
+        after = occupancy.people_count
+        if descending or ascending:
+            store.publish("occupancy", occupancy.snapshot())
 
-    print(f"[{dus_name}] {direction} -> people_count={after} exit_from_zero={exit_from_zero}")
+    if descending or ascending:
+        _set_alarm_source("motion_empty", False, "")
+
+    sensor_log.info("[%s] %s -> people_count=%s exit_from_zero=%s", dus_name, direction, after, exit_from_zero,
+                    extra={"category": dus_name})
     return (direction, exit_from_zero)
 
 def activate_dl1_for_10s():
     now = time.time()
 
-    with lock:
-        state["dl1_on"] = True
-        state["dl1_until"] = now + 10.0
-
-    mqtt_send(TOPIC_DL1_CMD, {"command": "ON"})
-    print("[DL1] ON for 10s")
-
-
-def background_loop():
-    while True:
-        now = time.time()
-
-        with lock:
-            ds_should_be_on = False
-            ds_reason = ""
-
-            for ds_name in ("DS1", "DS2"):
-                ds = state["ds"][ds_name]
-
-                # 0 open
-                if ds["value"] == 0 and ds["since"] is not None:
-                    if (now - ds["since"]) >= DS_UNLOCKED_SECONDS:
-                        ds["alarm_latched"] = True
+    with lights.lock:
+        lights.dl1_on = True
+        lights.dl1_until = now + DL1_ON_SECONDS
 
-                if ds["alarm_latched"]:
-                    ds_should_be_on = True
-                    if not ds_reason:
-                        ds_reason = f"{ds_name} open > {DS_UNLOCKED_SECONDS}s"
+        # ponovno paljenje produzava tajmer
+        timers.call_at("dl1_off", lights.dl1_until, _on_dl1_timeout)
+        store.publish("lights", lights.snapshot())
 
-            state["alarm_sources"]["ds_unlocked"]["active"] = ds_should_be_on
-            state["alarm_sources"]["ds_unlocked"]["reason"] = ds_reason
-
-            should_turn_off_dl1 = False
-            if state["dl1_on"] and now >= state["dl1_until"]:
-                state["dl1_on"] = False
-                state["dl1_until"] = 0.0
-                should_turn_off_dl1 = True
-
-            _recompute_alarm(now)
-
-        if should_turn_off_dl1:
-            mqtt_send(TOPIC_DL1_CMD, {"command": "OFF"})
-            print("[DL1] OFF (timeout)")
+    mqtt_send(TOPIC_DL1_CMD, {"command": "ON"})
+    log.info("[DL1] ON for 10s")
 
-        time.sleep(0.1)
 
 def _norm_ds01(v) -> int:
     # 0 = open, 1 = closed
@@ -320,10 +397,7 @@ def _norm_ds01(v) -> int:
     
 
 def trigger_motion_empty_alarm(pir_name: str, why: str):
-    with lock:
-        state["alarm_sources"]["motion_empty"]["active"] = True
-        state["alarm_sources"]["motion_empty"]["reason"] = f"{pir_name}: {why}"
-        _recompute_alarm(time.time())
+    _set_alarm_source("motion_empty", True, f"{pir_name}: {why}")
 
 def build_dht_update_payload(data: dict):
     name = str(data.get("name", ""))
@@ -344,78 +418,128 @@ def build_dht_update_payload(data: dict):
         "type": dht_type,      # "temperature" ili "humidity"
         "value": data.get("value")
     }
-def handle_sensor_message(data):
+def handle_dht_message(data):
+    dht_payload = build_dht_update_payload(data)
+    if dht_payload is not None:
+        mqtt_send(TOPIC_DHT_UPDATE, dht_payload)
+
+
+def handle_gsg_sensor_message(data):
+    if is_imu_payload(data):
+        handle_imu_message(data)
+        return
+
+    value = data.get("value")
+    store.publish("sensors", value, key="GSG")
+    handle_gsg_message(data.get("measurement", ""), value)
+
+
+def handle_imu_message(data):
+    # kombinovani oblik: svih 6 osa po uzorku, bez parsiranja measurement stringa
+    samples = [
+        (ts, dict(zip(AXES, values[:3])), dict(zip(AXES, values[3:])))
+        for ts, values in iter_imu_samples(data, time.time())
+    ]
+    if not samples:
+        return
+
+    # isti prikaz kao legacy (poslednja poslata osa je Gyroscope Z)
+    store.publish("sensors", samples[-1][2]["z"], key="GSG")
+    update_imu(samples)
+
+
+def handle_ds_message(data):
     name = data.get("name")
-    if not name:
+    if name not in ("DS1", "DS2"):
         return
 
     value = data.get("value")
     now = time.time()
+    v01 = _norm_ds01(value)  
+
+    store.publish("sensors", v01, key=name)
+
+    with doors.lock:
+        d = doors.doors[name]
+        prev = d.value
+        d.value = v01
+
+        if prev != v01:
+            if v01 == 0:
+                # start timer when released 0
+                d.since = now
+                _arm_ds_timer(name, now)
+                store.publish("doors", doors.snapshot())
+            else:
+                # resed when back on 1
+                d.since = None
+                d.alarm_latched = False
+                timers.cancel(f"ds_unlocked:{name}")
+                store.publish("doors", doors.snapshot())
+                _refresh_ds_alarm_source()
+
+            sensor_log.info("[%s] value=%r normalized=%s", name, value, v01, extra={"category": name})
 
-    measurement = data.get("measurement", "")
-     # --- DHT ---
-    if str(name).startswith("DHT"):
-        dht_payload = build_dht_update_payload(data)
-        if dht_payload is not None:
-            mqtt_send(TOPIC_DHT_UPDATE, dht_payload)
+
+def handle_dus_message(data):
+    name = data.get("name")
+    if not name or data.get("measurement") != "Distance":
         return
-    if name == "GSG":
-        with lock:
-            state["sensors"]["GSG"] = value
-        handle_gsg_message(measurement, value)
+
+    try:
+        d = float(data.get("value"))
+    except Exception:
         return
 
-    if name in ("DS1", "DS2"):
-        v01 = _norm_ds01(value)  
+    now = time.time()
 
-        with lock:
-            ds_state = state["ds"][name]
-            prev = ds_state["value"]
-            ds_state["value"] = v01
-            state["sensors"][name] = v01
+    # TimeWindow ima svoj lock i sam izbacuje uzorke starije od 20s
+    hist = dus_history.get(name)
+    if hist is None:
+        hist = dus_history.setdefault(name, TimeWindow(DUS_HISTORY_WINDOW_S))
+    hist.append(now, d)
 
-            if prev != v01:
-                if v01 == 0:
-                    # start timer when released 0
-                    ds_state["since"] = now
-                else:
-                    # resed when back on 1
-                    ds_state["since"] = None
-                    ds_state["alarm_latched"] = False
+    store.publish("sensors", d, key=name)
+    _publish_dus_history(name, hist, now)
 
-                print(f"[{name}] value={value!r} normalized={v01}")
 
-        return
+def _publish_dus_history(name: str, hist: TimeWindow, now: float):
+    stats = hist.stats(now)     # prvo izbacivanje, pa last_5 iz istog prozora
+    store.publish("dus", {"last_5": hist.last(5), "stats": stats}, key=name)
 
-    with lock:
-        if name in ("DPIR1", "DPIR2", "DPIR3"):
-            state["sensors"][name] = value
+    # i bez novih poruka stats mora da prati prozor: tajmer kad najstariji uzorak
+    # istekne (izbacuju se uzorci strogo stariji od prozora, otud +10ms)
+    key = f"dus_history:{name}"
+    oldest = hist.oldest()
+    if oldest is not None and not timers.is_pending(key):
+        timers.call_at(key, oldest[0] + hist.window_s + 0.01, lambda: _on_dus_history_expired(name))
 
-        elif name in ("DUS1", "DUS2"):
-            try:
-                d = float(value)
-                state["sensors"][name] = d
 
-                hist = state["dus_history"].setdefault(name, [])
-                hist.append((now, d))
+def _on_dus_history_expired(name: str):
+    _publish_dus_history(name, dus_history[name], time.time())
 
-                # keep last 20s
-                state["dus_history"][name] = [(t, x) for (t, x) in hist if now - t <= 20]
-            except Exception:
-                pass
-    
+
+def handle_pir_message(data):
+    name = data.get("name")
+    if name not in ("DPIR1", "DPIR2", "DPIR3"):
+        return
+
+    value = data.get("value")
+    now = time.time()
+
+    store.publish("sensors", value, key=name)
 
     is_motion = str(value) in ("1", "True", "true", "detected")
-    if name not in ("DPIR1", "DPIR2", "DPIR3") or not is_motion:
+    if not is_motion:
         return
 
     if name == "DPIR1":
         activate_dl1_for_10s()
 
-        direction, exit_from_zero = infer_entry_exit_from_dus("DUS1", "PI1")
-        with lock:
-            pc_after = int(state.get("people_count", 0))
-            grace_until = float(state.get("empty_grace_until", 0.0))
+        direction, exit_from_zero = infer_entry_exit_from_dus("DUS1")
+        with occupancy.lock:
+            pc_after = occupancy.people_count
+            grace_until = occupancy.empty_grace_until
             in_grace = (pc_after == 0 and now < grace_until)
             
         if direction == "ULAZAK":
@@ -428,7 +552,7 @@ def handle_sensor_message(data):
             return
 
         if in_grace:
-            print(f"[DPIR1] motion ignored (empty grace until {grace_until:.2f})")
+            sensor_log.info("[DPIR1] motion ignored (empty grace until %.2f)", grace_until, extra={"category": "DPIR1"})
             return
 
         if pc_after == 0:
@@ -437,11 +561,11 @@ def handle_sensor_message(data):
         return
 
     if name == "DPIR2":
-        direction, exit_from_zero = infer_entry_exit_from_dus("DUS2", "PI2")
+        direction, exit_from_zero = infer_entry_exit_from_dus("DUS2")
 
-        with lock:
-            pc_after = int(state.get("people_count", 0))
-            grace_until = float(state.get("empty_grace_until", 0.0))
+        with occupancy.lock:
+            pc_after = occupancy.people_count
+            grace_until = occupancy.empty_grace_until
             in_grace = (pc_after == 0 and now < grace_until)
 
         if direction == "ULAZAK":
@@ -455,7 +579,7 @@ def handle_sensor_message(data):
             return
 
         if in_grace:
-            print(f"[DPIR2] motion ignored (empty grace until {grace_until:.2f})")
+            sensor_log.info("[DPIR2] motion ignored (empty grace until %.2f)", grace_until, extra={"category": "DPIR2"})
             return
 
         if pc_after == 0:
@@ -464,9 +588,9 @@ def handle_sensor_message(data):
         return
 
     if name == "DPIR3":
-        with lock:
-            pc = int(state.get("people_count", 0))
-            grace_until = float(state.get("empty_grace_until", 0.0))
+        with occupancy.lock:
+            pc = occupancy.people_count
+            grace_until = occupancy.empty_grace_until
             in_grace = (pc == 0 and now < grace_until)
 
         if pc == 0 and not in_grace:
@@ -474,6 +598,75 @@ def handle_sensor_message(data):
         return
 
 
+# name -> handler (za /store_data, gde nema MQTT teme)
+SENSOR_HANDLERS = {
+    "DS1": handle_ds_message,
+    "DS2": handle_ds_message,
+    "DUS1": handle_dus_message,
+    "DUS2": handle_dus_message,
+    "DPIR1": handle_pir_message,
+    "DPIR2": handle_pir_message,
+    "DPIR3": handle_pir_message,
+    "GSG": handle_gsg_sensor_message,
+}
+
+
+def update_rollups(data, ts=None):
+    name = data.get("name")
+    measurement = data.get("measurement")
+    if name and measurement:
+        rollups.record(str(name), str(measurement), data.get("value"), time.time() if ts is None else ts)
+
+
+def reading_ts(data):
+    """
+    Vreme ocitavanja iz poruke ("ts", za IMU frame poslednji uzorak) ili None.
+    """
+    samples = data.get("samples")
+    if isinstance(samples, list) and samples and isinstance(samples[-1], (list, tuple)) and samples[-1]:
+        ts = samples[-1][0]
+    else:
+        ts = data.get("ts")
+    if isinstance(ts, (int, float)) and not isinstance(ts, bool):
+        return float(ts)
+    return None
+
+
+def persist_reading(data, filtered=True):
+    """
+    Upis u bazu (kroz deadband filter) i rollup-ovi.
+    IMU poruka se razlaze na legacy per-axis tacke sa vremenom uzorka.
+    """
+    now = time.time()
+    if is_imu_payload(data):
+        readings = [
+            (reading, ts)
+            for ts, values in iter_imu_samples(data, now)
+            for reading in legacy_readings(data, ts, values)
+        ]
+    else:
+        # "ts" salje Pi: poruka poslata posle prekida zadrzava vreme ocitavanja
+        readings = [(data, reading_ts(data))]
+
+    for reading, ts in readings:
+        if not filtered or persist_filter.allow(reading, now if ts is None else ts):
+            save_to_db(reading, ts)
+        update_rollups(reading, ts)
+
+
+def handle_sensor_message(data):
+    name = data.get("name")
+    if not name:
+        return
+
+    handler = SENSOR_HANDLERS.get(name)
+    if handler is None and str(name).startswith("DHT"):
+        handler = handle_dht_message
+
+    if handler is not None:
+        handler(data)
+
+
 def handle_gsg_message(measurement: str, value):
     try:
         v = float(value)
@@ -498,35 +691,47 @@ def handle_gsg_message(measurement: str, value):
     if axis is None:
         return
 
+    if is_acc:
+        update_imu([(time.time(), {axis: v}, None)])
+    else:
+        update_imu([(time.time(), None, {axis: v})])
+
+
+def update_imu(samples):
+    """
+    samples: [(ts, accel, gyro)], accel/gyro su {osa: vrednost} ili None (legacy
+    poruka nosi samo jednu osu). Detekcija pomeraja radi za svaki uzorak redom,
+    snapshot se objavljuje jednom.
+    """
     now = time.time()
 
     moved = False
     acc_norm = None
     gyr_norm = None
 
-    with lock:
-        g = state["gsg"]
-
-        if is_acc:
-            g["accel"][axis] = v
-        else:
-            g["gyro"][axis] = v
+    with imu.lock:
+        for _ts, accel, gyro in samples:
+            if accel:
+                imu.accel.update(accel)
+            if gyro:
+                imu.gyro.update(gyro)
 
-        ax, ay, az = g["accel"]["x"], g["accel"]["y"], g["accel"]["z"]
-        gx, gy, gz = g["gyro"]["x"],  g["gyro"]["y"],  g["gyro"]["z"]
+            ax, ay, az = imu.accel["x"], imu.accel["y"], imu.accel["z"]
+            gx, gy, gz = imu.gyro["x"],  imu.gyro["y"],  imu.gyro["z"]
 
-        if ax is None or ay is None or az is None or gx is None or gy is None or gz is None:
-            return
+            if ax is None or ay is None or az is None or gx is None or gy is None or gz is None or imu.cooldown:
+                continue
 
-        if (now - float(g.get("last_trigger", 0.0))) < GSG_COOLDOWN_S:
-            return
+            acc_norm = math.sqrt(ax*ax + ay*ay + az*az)
+            gyr_norm = math.sqrt(gx*gx + gy*gy + gz*gz)
 
-        acc_norm = math.sqrt(ax*ax + ay*ay + az*az)
-        gyr_norm = math.sqrt(gx*gx + gy*gy + gz*gz)
+            moved = (abs(acc_norm - 1.0) >= GSG_ACCEL_DELTA_THR) or (gyr_norm >= GSG_GYRO_NORM_THR)
+            if moved:
+                imu.last_trigger = now
+                imu.cooldown = True
+                timers.call_later("gsg_cooldown", GSG_COOLDOWN_S, _on_gsg_cooldown_end)
 
-        moved = (abs(acc_norm - 1.0) >= GSG_ACCEL_DELTA_THR) or (gyr_norm >= GSG_GYRO_NORM_THR)
-        if moved:
-            g["last_trigger"] = now
+        store.publish("imu", imu.snapshot())
 
     if moved:
         alarm_pulse("gsg_move", ALARM_HOLD_S, reason=f"GSG moved (acc={acc_norm:.2f}, gyro={gyr_norm:.1f})")
@@ -534,65 +739,305 @@ def handle_gsg_message(measurement: str, value):
 # -----------------------------
 # MQTT setup
 # -----------------------------
+def handle_db_cmd_message(data):
+    cmd = str(data.get("command", "")).upper()
+    if cmd != "OFF":
+        return
+
+    alarm_log.warning("Manual OFF received")
+
+    with doors.lock:
+        with alarm.lock:
+            for src in alarm.sources.values():
+                src.active = False
+                src.reason = ""
+
+            alarm.on = False
+            alarm.reason = "Manual OFF"
+            alarm.reasons = ["Manual OFF"]
+            store.publish("alarm", alarm.snapshot())
+
+        for ds_name, d in doors.doors.items():
+            d.alarm_latched = False
+
+            # vrata i dalje otvorena -> ponovo latch (odmah ako je rok vec prosao)
+            if d.value == 0 and d.since is not None:
+                _arm_ds_timer(ds_name, d.since)
+
+        store.publish("doors", doors.snapshot())
+
+
+def handle_generic_message(data):
+    # senzori bez logike u kontroleru (DMS, BTN, SD4, IR, BRGB, LCD, ...) -> samo upis u bazu
+    pass
+
+
+# Pi uredjaji objavljuju na "<runs_on>/<name>[/...]"
+SENSOR_TOPIC_ROOTS = ("PI1", "PI2", "PI3")
+
+# prva ruta koja odgovara temi pobedjuje
+router = TopicRouter()
+router.add(TOPIC_DB_CMD, handle_db_cmd_message, persist=False)
+router.add("+/DS1", handle_ds_message)
+router.add("+/DS2", handle_ds_message)
+router.add("+/DUS1", handle_dus_message)
+router.add("+/DUS2", handle_dus_message)
+router.add("+/DPIR1", handle_pir_message)
+router.add("+/DPIR2", handle_pir_message)
+router.add("+/DPIR3", handle_pir_message)
+router.add("+/GSG/#", handle_gsg_sensor_message)
+router.add("+/+/Humidity", handle_dht_message)
+router.add("+/+/Temperature", handle_dht_message)
+for root in SENSOR_TOPIC_ROOTS:
+    router.add(f"{root}/#", handle_generic_message)
+
+# bez "#": kontroler ne prima sopstvene komande aktuatorima (osim DB OFF)
+MQTT_SUBSCRIPTIONS = [(f"{root}/#", 0) for root in SENSOR_TOPIC_ROOTS] + [(TOPIC_DB_CMD, 0)]
+
+
 def on_connect(client, userdata, flags, rc):
-    print("MQTT CONNECTED:", rc)
-    client.subscribe("#")  # za sad sve topice
+    mqtt_log.info("CONNECTED: %s", rc)
+    client.subscribe(MQTT_SUBSCRIPTIONS)
 
 
 def on_message(client, userdata, msg):
-    print("MQTT:", msg.topic, msg.payload)
+    # paho mrezna nit: ruta, dekodiranje i ubacivanje u red
+    if mqtt_log.isEnabledFor(logging.DEBUG):
+        mqtt_log.debug("RECV %s %s", msg.topic, msg.payload, extra={"category": msg.topic})
+
+    route = router.resolve(msg.topic)
+    if route is None:
+        return
+
+    # Pi salje JSON ili kompaktni binarni format (PUBLISHER.encoding), prepoznaje se po prvom bajtu
     try:
-        data = json.loads(msg.payload.decode())
+        if is_compact(msg.payload):
+            data = decode_compact(msg.topic, msg.payload)
+        else:
+            data = json.loads(msg.payload.decode())
     except Exception as e:
-        print("JSON ERROR:", e)
+        mqtt_log.warning("PAYLOAD ERROR on %s: %s", msg.topic, e, extra={"category": msg.topic})
         return
-    
-    if msg.topic == TOPIC_DB_CMD:
-        cmd = str(data.get("command", "")).upper()
 
-        if cmd == "OFF":
-            print("[ALARM] Manual OFF received")
+    if not isinstance(data, dict):
+        return
 
-            with lock:
-                for k in state["alarm_sources"].keys():
-                    state["alarm_sources"][k]["active"] = False
-                    state["alarm_sources"][k]["reason"] = ""
+    name = str(data.get("name") or msg.topic)
+    backpressure = WORKER_BULK_BACKPRESSURE if name.startswith(WORKER_BULK_DEVICES) else None
+    worker_pool.submit(WORKER_SHARD_GROUPS.get(name, name), (route, data), backpressure)
 
-                for ds_name in ("DS1", "DS2"):
-                    state["ds"][ds_name]["alarm_latched"] = False
 
-                state["alarm_on"] = False
-                state["alarm_reason"] = "Manual OFF"
-                state["alarm_reasons"] = ["Manual OFF"]
+_stale_lock = threading.Lock()
+stale_readings = 0
+_skew_logged = {}       # runs_on -> time.monotonic() poslednjeg upozorenja
 
-    save_to_db(data)
-    handle_sensor_message(data)
+
+def _check_clock_skew(data):
+    ts = reading_ts(data)
+    if ts is None:
+        return
+    skew = time.time() - ts
+    if abs(skew) <= CLOCK_SKEW_WARN_S:
+        return
+
+    runs_on = str(data.get("runs_on") or "?")
+    now = time.monotonic()
+    with _stale_lock:
+        last = _skew_logged.get(runs_on)
+        if last is not None and now - last < CLOCK_SKEW_LOG_S:
+            return
+        _skew_logged[runs_on] = now
+    log.warning("clock skew: %s reading ts is %+.1fs behind the controller clock (%s)",
+                runs_on, skew, data.get("name"), extra={"category": f"skew:{runs_on}"})
+
+
+def process_message(item):
+    global stale_readings
+
+    route, data = item
+
+    if route.persist:
+        persist_reading(data)
+
+    age = data.get("replay_age_s")
+    if age is None:
+        _check_clock_skew(data)
+    elif isinstance(age, (int, float)) and not isinstance(age, bool) and age > STALE_READING_S:
+        with _stale_lock:
+            stale_readings += 1
+        return
+    route.handler(data)
+
+
+worker_pool = ShardedWorkerPool(
+    process_message,
+    num_workers=WORKER_COUNT,
+    queue_size=WORKER_QUEUE_SIZE,
+    backpressure=WORKER_BACKPRESSURE,
+)
+worker_pool.start()
 
 mqtt_client = mqtt.Client()
 mqtt_client.on_connect = on_connect
 mqtt_client.on_message = on_message
 mqtt_client.connect("127.0.0.1", 1883, 60)
-print("Subscribing to ALL topics...")
+log.info("Subscribing to sensor topics...")
 mqtt_client.loop_start()
 
 
+def build_status(snap) -> dict:
+    occ = snap["occupancy"]
+    lt = snap["lights"]
+    al = snap["alarm"]
+    dus = snap["dus"]
+
+    return {
+        "people_count": occ["people_count"],
+        "dl1_on": lt["dl1_on"],
+        "dl1_until": lt["dl1_until"],
+        "sensors": snap["sensors"],
+
+        "alarm_on": al["on"],
+        "reason": al["reason"],
+        "ds_debug": snap["doors"],
+        "dus_history_last_5": {name: v["last_5"] for name, v in dus.items()},
+        "dus_stats": {name: v["stats"] for name, v in dus.items()},
+    }
+
+
+status_cache = StatusCache(store, build_status, history=STATUS_HISTORY)
+
+
+def _status_etag(version: int) -> str:
+    return f'"{version}"'
+
+
 @app.route("/status", methods=["GET"])
 def status():
-    with lock:
-        return jsonify({
-            "people_count": state["people_count"],
-            "dl1_on": state["dl1_on"],
-            "dl1_until": state["dl1_until"],
-            "sensors": state["sensors"],
-
-            "alarm_on": state.get("alarm_on", False),
-            "reason": state["alarm_reason"],
-            "ds_debug": state.get("ds", {}),
-            "dus_history_last_5": {
-                "DUS1": state.get("dus_history", {}).get("DUS1", [])[-5:],
-                "DUS2": state.get("dus_history", {}).get("DUS2", [])[-5:],
-            },
-        })
+    """
+    - ETag je verzija snapshot-a; If-None-Match sa istom verzijom -> 304
+    - ?since=<version> vraca samo polja promenjena od te verzije
+      (ako verzija vise nije u istoriji, vraca ceo status)
+    """
+    # snapshot se samo procita; nema lock-a sa ingestion nitima
+    version, data, body = status_cache.get()
+    etag = _status_etag(version)
+
+    since = request.args.get("since")
+    if since is not None:
+        try:
+            since = int(since)
+        except ValueError:
+            return jsonify({"error": "since must be an integer version"}), 400
+
+    if request.headers.get("If-None-Match") == etag or since == version:
+        return Response(status=304, headers={"ETag": etag})
+
+    if since is not None:
+        changed = status_cache.changed_since(since, version, data)
+        if changed is not None:
+            resp = jsonify({"version": version, "since": since, "delta": True, "changed": changed})
+            resp.headers["ETag"] = etag
+            return resp
+
+    return Response(body, mimetype="application/json", headers={"ETag": etag})
+
+
+push_hub = PushHub(max_clients=PUSH_MAX_CLIENTS, max_pending=PUSH_MAX_PENDING)
+
+
+def _state_event(part, key, value):
+    """
+    Objava dela snapshot-a -> (kljuc za spajanje, ime dogadjaja, data) ili None.
+    """
+    if part == "sensors":
+        return f"sensor:{key}", "sensor", {"name": key, "value": value}
+    if part == "occupancy":
+        return "people_count", "people_count", {"people_count": value["people_count"]}
+    if part == "alarm":
+        return "alarm", "alarm", {"alarm_on": value["on"], "reason": value["reason"], "reasons": value["reasons"]}
+    if part == "doors":
+        return "doors", "doors", value
+    if part == "lights":
+        return "lights", "lights", value
+    if part == "dus":
+        return f"dus:{key}", "dus", {"name": key, "last_5": value["last_5"], "stats": value["stats"]}
+    return None
+
+
+def _on_state_publish(version, part, key, value):
+    ev = _state_event(part, key, value)
+    if ev is not None:
+        push_hub.publish(ev[0], version, ev[1], ev[2])
+
+
+store.subscribe(_on_state_publish)
+
+
+def _sse(event, version, data) -> str:
+    return f"id: {version}\nevent: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.route("/events", methods=["GET"])
+def events():
+    """
+    Server-Sent Events: prvo "status" sa celim stanjem, zatim samo promene
+    (sensor, people_count, alarm, doors, lights, dus). Spor klijent dobija
+    poslednju vrednost po kljucu umesto svih medjukoraka.
+    """
+    client = push_hub.subscribe()
+    if client is None:
+        return jsonify({"error": "too many event subscribers"}), 503
+
+    def stream():
+        try:
+            # pretplata pre citanja snapshot-a -> nijedna promena ne propada;
+            # dogadjaji stariji od snapshot-a se preskacu
+            version, _data, body = status_cache.get()
+            yield f"id: {version}\nevent: status\ndata: {body}\n\n"
+
+            while not client.closed:
+                items = client.drain(timeout=PUSH_KEEPALIVE_S)
+                if not items:
+                    yield ": keepalive\n\n"
+                    continue
+
+                yield "".join(_sse(ev, v, data) for v, ev, data in items if v > version)
+        finally:
+            push_hub.unsubscribe(client)
+
+    return Response(stream(), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
+    })
+
+
+@app.route("/sensors/<name>/stats", methods=["GET"])
+def sensor_stats(name):
+    """
+    Iz memorije, bez Influx-a: poslednja vrednost i count/min/max/mean/slope
+    za poslednji minut (1s bucket-i), sat (1m) i dan (15m), po merenju.
+    ?measurement=... vraca samo jedno merenje.
+    """
+    stats = rollups.stats(name, time.time(), measurement=request.args.get("measurement"))
+    if stats is None:
+        return jsonify({"status": "error", "message": f"unknown sensor: {name}"}), 404
+
+    return jsonify({"name": name, "measurements": stats})
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    return jsonify({
+        "influx_writer": influx_writer.stats(),
+        "workers": worker_pool.stats(),
+        "timers": timers.stats(),
+        "router": router.stats(),
+        "stale_readings": stale_readings,
+        "push": push_hub.stats(),
+        "timeseries": timeseries.stats(),
+        "persist_filter": persist_filter.stats(),
+    })
 
 
 @app.route("/store_data", methods=["POST"])
@@ -602,16 +1047,45 @@ def store_data_route():
     """
     try:
         data = request.get_json(force=True)
-        save_to_db(data)
+        persist_reading(data, filtered=False)
         handle_sensor_message(data)
         return jsonify({"status": "success"})
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 400
 
 
+def _ndjson_response(rows):
+    """
+    Jedan JSON red po tacki, salje se kako stize (chunked), bez liste u memoriji.
+    Greska u toku citanja se javlja kao poslednji red {"error": ...}.
+    """
+    def gen():
+        try:
+            for row in rows:
+                yield json.dumps(row, default=str) + "\n"
+        except Exception as e:
+            log.error("INFLUX STREAM ERROR: %s", e)
+            yield json.dumps({"error": str(e)}) + "\n"
+
+    return Response(gen(), mimetype="application/x-ndjson", headers={"X-Accel-Buffering": "no"})
+
+
+def _wants_stream() -> bool:
+    return request.args.get("format") == "ndjson"
+
+
 def handle_influx_query(query):
+    """
+    ?format=ndjson -> redovi se salju kako stizu iz query_stream;
+    inace ceo rezultat kao jedan JSON (staro ponasanje).
+    """
     try:
         query_api = influxdb_client.query_api()
+
+        if _wants_stream():
+            records = query_api.query_stream(query, org=org)
+            return _ndjson_response(record.values for record in records)
+
         tables = query_api.query(query, org=org)
 
         container = []
@@ -624,6 +1098,35 @@ def handle_influx_query(query):
         return jsonify({"status": "error", "message": str(e)}), 500
 
 
+timeseries = TimeseriesService(
+    influxdb_client, bucket, org,
+    cache_size=TIMESERIES_CACHE_SIZE,
+    cache_ttl_s=TIMESERIES_CACHE_TTL_S,
+)
+
+
+@app.route("/timeseries", methods=["GET"])
+def timeseries_route():
+    """
+    /timeseries?measurement=DHTTemperature&name=DHT1&runs_on=PI1&range=1h&window=1m&aggregate=mean
+    - range: 30s/10m/2h/7d (podrazumevano 10m), window i aggregate su opcioni
+    - window bez aggregate -> mean; aggregate bez window -> jedna vrednost za ceo range
+    - format=ndjson -> tacke se salju kako stizu (bez kesa), za duge range-ove
+    """
+    try:
+        if _wants_stream():
+            return _ndjson_response(timeseries.open_stream(request.args))
+
+        result = timeseries.query(request.args)
+    except QueryError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    except Exception as e:
+        log.error("TIMESERIES QUERY ERROR: %s", e)
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+    return jsonify({"status": "success", "data": result})
+
+
 @app.route("/simple_query", methods=["GET"])
 def retrieve_simple_data():
     query = f"""from(bucket: "{bucket}")
@@ -643,7 +1146,4 @@ def retrieve_aggregate_data():
 
 
 if __name__ == "__main__":
-    # start background timeout loop
-    threading.Thread(target=background_loop, daemon=True).start()
-
     app.run(host="0.0.0.0", port=5001, debug=False, use_reloader=False)
\ No newline at end of file
@@ -0,0 +1,106 @@
+import math
+import threading
+
+
+class DeadbandFilter:
+    """
+    Odlucuje da li se senzorska poruka upisuje u bazu:
+    - pravila po imenu uredjaja (npr. "GSG") ili po measurement-u (npr. "DHTTemperature");
+      ime ima prednost, bez pravila poruka uvek prolazi
+    - pravilo {"abs": 0.5, "rel": 0.02, "heartbeat_s": 60}:
+        broj -> upis ako je |v - poslednji upisan| > abs ili > rel * |poslednji upisan|
+                (abs i rel 0 -> upis samo kada se vrednost promeni)
+        tekst/bool -> upis samo kada se vrednost promeni
+        heartbeat_s -> upis i bez promene kada je serija toliko dugo bila tiha
+    - serija je (measurement, name, runs_on)
+    """
+
+    def __init__(self, rules=None, heartbeat_s=60.0):
+        self.rules = dict(rules or {})
+        self.heartbeat_s = float(heartbeat_s)
+        self._last = {}         # (measurement, name, runs_on) -> (value, ts)
+        self._lock = threading.Lock()
+        self._counts = {}       # measurement -> [seen, persisted]
+
+    def rule_for(self, measurement: str, name: str):
+        rule = self.rules.get(name)
+        if rule is None:
+            rule = self.rules.get(measurement)
+        return rule
+
+    def allow(self, data: dict, now: float) -> bool:
+        measurement = str(data.get("measurement", ""))
+        name = str(data.get("name", ""))
+        value = data.get("value")
+
+        rule = self.rule_for(measurement, name)
+        if rule is None:
+            with self._lock:
+                self._count(measurement, True)
+            return True
+
+        key = (measurement, name, str(data.get("runs_on", "")))
+        heartbeat_s = float(rule.get("heartbeat_s", self.heartbeat_s))
+
+        with self._lock:
+            last = self._last.get(key)
+            if last is None or now - last[1] >= heartbeat_s:
+                ok = True
+            else:
+                ok = self._changed(rule, last[0], value)
+
+            if ok:
+                self._last[key] = (value, now)
+            self._count(measurement, ok)
+
+        return ok
+
+    @staticmethod
+    def _changed(rule, old, new) -> bool:
+        if isinstance(new, bool) or isinstance(old, bool):
+            return new != old
+
+        try:
+            o = float(old)
+            n = float(new)
+        except (TypeError, ValueError):
+            return new != old
+
+        if not (math.isfinite(o) and math.isfinite(n)):
+            return new != old
+
+        diff = abs(n - o)
+        abs_thr = float(rule.get("abs", 0.0))
+        rel_thr = float(rule.get("rel", 0.0))
+        if abs_thr <= 0 and rel_thr <= 0:
+            return diff > 0
+
+        return (abs_thr > 0 and diff > abs_thr) or (rel_thr > 0 and diff > rel_thr * abs(o))
+
+    def _count(self, measurement, persisted):
+        # poziva se pod self._lock
+        c = self._counts.get(measurement)
+        if c is None:
+            c = self._counts[measurement] = [0, 0]
+        c[0] += 1
+        if persisted:
+            c[1] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            per = {m: (c[0], c[1]) for m, c in self._counts.items()}
+            series = len(self._last)
+
+        seen = sum(s for s, _ in per.values())
+        persisted = sum(p for _, p in per.values())
+        return {
+            "series": series,
+            "seen": seen,
+            "persisted": persisted,
+            "suppressed": seen - persisted,
+            "compression_ratio": round(seen / persisted, 3) if persisted else None,
+            "measurements": {
+                m: {"seen": s, "persisted": p, "compression_ratio": round(s / p, 3) if p else None}
+                for m, (s, p) in sorted(per.items())
+            },
+        }
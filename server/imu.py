@@ -0,0 +1,54 @@
+AXES = ("x", "y", "z")
+
+# legacy per-axis oblik: measurement "<runs_on>/<name>/Accelerometer X" itd.
+_LEGACY_KINDS = (("Accelerometer", 0), ("Gyroscope", 3))
+
+
+def is_imu_payload(data: dict) -> bool:
+    """
+    Kombinovana IMU poruka (jedan uzorak ili frame), za razliku od
+    legacy poruke sa jednom osom u "value".
+    """
+    return "samples" in data or ("accel" in data and "gyro" in data)
+
+
+def iter_imu_samples(data: dict, default_ts: float):
+    """
+    Uzorci iz IMU poruke kao (ts, (ax, ay, az, gx, gy, gz)):
+    - jedan uzorak: {"ts": .., "accel": [ax, ay, az], "gyro": [gx, gy, gz]}
+    - frame:        {"samples": [[ts, ax, ay, az, gx, gy, gz], ...]}
+    Neispravni uzorci se preskacu.
+    """
+    samples = data.get("samples")
+    if samples is None:
+        samples = [[data.get("ts"), *(data.get("accel") or ()), *(data.get("gyro") or ())]]
+
+    for s in samples:
+        if not isinstance(s, (list, tuple)) or len(s) != 7:
+            continue
+        try:
+            values = tuple(float(v) for v in s[1:])
+            ts = float(s[0]) if s[0] is not None else default_ts
+        except (TypeError, ValueError):
+            continue
+        yield ts, values
+
+
+def legacy_readings(data: dict, ts: float, values):
+    """
+    Jedan IMU uzorak -> 6 poruka u legacy obliku (isti measurement-i u bazi
+    kao pre, pa postojeci Grafana paneli i dalje rade).
+    """
+    runs_on = data.get("runs_on", "")
+    name = data.get("name", "GSG")
+    prefix = f"{runs_on}/{name}"
+
+    for kind, offset in _LEGACY_KINDS:
+        for i, axis in enumerate(AXES):
+            yield {
+                "measurement": f"{prefix}/{kind} {axis.upper()}",
+                "simulated": data.get("simulated", True),
+                "runs_on": runs_on,
+                "name": name,
+                "value": values[offset + i],
+            }
@@ -0,0 +1,247 @@
+import logging
+import queue
+import threading
+import time
+
+from influxdb_client.client.write_api import SYNCHRONOUS
+from influxdb_client.rest import ApiException
+
+from latency import LatencySamples
+
+log = logging.getLogger(__name__)
+
+# koliko linija odbijenog batch-a ide u log
+REJECTED_LOG_LINES = 5
+
+
+def is_rejected(e: Exception) -> bool:
+    """
+    Influx je odbio batch (4xx: konflikt tipa polja, tacke van retention-a...):
+    ponovni pokusaj ne pomaze. 429 (rate limit) je privremen, kao i 5xx i
+    greske konekcije.
+    """
+    status = getattr(e, "status", None) if isinstance(e, ApiException) else None
+    return status is not None and 400 <= int(status) < 500 and int(status) != 429
+
+
+class InfluxBatchWriter:
+    """
+    Asinhroni upis u InfluxDB:
+    - save_to_db samo ubacuje tacku u bounded red (ne ceka HTTP)
+    - pozadinska nit prazni red i salje batch kada se skupi batch_size
+      tacaka ili kada najstarija tacka ceka max_linger_s
+    - jedan write_api za ceo zivot procesa
+    - sa spill logom: batch koji ne prodje (ili tacka za koju nema mesta u redu)
+      ide na disk umesto da se odbaci; dok je Influx nedostupan (retry_s posle
+      greske) batch-evi idu pravo u spill, bez cekanja na HTTP timeout
+    - replay nit prazni spill u velikim batch-evima kada Influx proradi
+    - batch koji Influx odbije (4xx) se loguje i odbacuje ("rejected"); spill
+      i retry su samo za greske konekcije i 5xx
+    """
+
+    def __init__(self, client, bucket, org, batch_size=500, max_linger_s=0.5, max_queue=50000,
+                 spill=None, retry_s=5.0, replay_batch_size=5000):
+        self.client = client
+        self.bucket = bucket
+        self.org = org
+        self.batch_size = int(batch_size)
+        self.max_linger_s = float(max_linger_s)
+
+        self._queue = queue.Queue(maxsize=int(max_queue))
+        self._write_api = client.write_api(write_options=SYNCHRONOUS)
+        self._stop = threading.Event()
+        self._thread = None
+
+        self.spill = spill
+        self.retry_s = float(retry_s)
+        self.replay_batch_size = int(replay_batch_size)
+        self._down_until = 0.0
+        self._replay_thread = None
+
+        self._stats_lock = threading.Lock()
+        self._flush_ms = LatencySamples()
+        self._stats = {
+            "enqueued": 0,
+            "written": 0,
+            "dropped": 0,
+            "failed": 0,
+            "spilled": 0,
+            "replayed": 0,
+            "rejected": 0,
+            "batches": 0,
+            "last_batch_size": 0,
+            "last_flush_ms": 0.0,
+            "max_flush_ms": 0.0,
+            "total_flush_ms": 0.0,
+        }
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return self._thread
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+        if self.spill is not None:
+            self._replay_thread = threading.Thread(target=self._replay_run, daemon=True)
+            self._replay_thread.start()
+        return self._thread
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=timeout)
+        if self._replay_thread:
+            self._replay_thread.join(timeout=timeout)
+
+    def write(self, record) -> bool:
+        """
+        Ne blokira: ako je red pun, tacka ide u spill (ako postoji),
+        inace se odbacuje i broji u "dropped".
+        """
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            if self._spill([record]):
+                return True
+            with self._stats_lock:
+                self._stats["dropped"] += 1
+            return False
+
+        with self._stats_lock:
+            self._stats["enqueued"] += 1
+        return True
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            s = dict(self._stats)
+
+        batches = s.pop("batches")
+        total_ms = s.pop("total_flush_ms")
+        s["batches"] = batches
+        s["avg_flush_ms"] = round(total_ms / batches, 3) if batches else 0.0
+        s["flush"] = self._flush_ms.percentiles()
+        s["queue_depth"] = self._queue.qsize()
+        s["queue_capacity"] = self._queue.maxsize
+        s["influx_up"] = time.monotonic() >= self._down_until
+        if self.spill is not None:
+            s["spill"] = self.spill.stats()
+        return s
+
+    def _spill(self, records) -> bool:
+        if self.spill is None:
+            return False
+        # spill cuva line protocol; Point objekti se ne mogu sacuvati
+        lines = [r for r in records if isinstance(r, str)]
+        if not lines or not self.spill.append(lines):
+            return False
+        with self._stats_lock:
+            self._stats["spilled"] += len(lines)
+        return True
+
+    def _mark_down(self):
+        self._down_until = time.monotonic() + self.retry_s
+
+    def _reject(self, records, e, source):
+        lines = [r if isinstance(r, str) else repr(r) for r in records[:REJECTED_LOG_LINES]]
+        log.error("%s: Influx rejected %d point(s), dropping: %s; first lines: %s",
+                  source, len(records), e, lines)
+        with self._stats_lock:
+            self._stats["rejected"] += len(records)
+
+    def _run(self):
+        pending = []
+        deadline = None
+
+        while not self._stop.is_set() or pending or not self._queue.empty():
+            if deadline is None:
+                timeout = self.max_linger_s
+            else:
+                timeout = max(0.0, deadline - time.monotonic())
+
+            try:
+                pending.append(self._queue.get(timeout=timeout))
+                if deadline is None:
+                    deadline = time.monotonic() + self.max_linger_s
+
+                # pokupi sve sto je vec u redu, bez cekanja
+                while len(pending) < self.batch_size:
+                    pending.append(self._queue.get_nowait())
+            except queue.Empty:
+                pass
+
+            if not pending:
+                continue
+
+            if len(pending) >= self.batch_size or time.monotonic() >= deadline or self._stop.is_set():
+                self._flush(pending)
+                pending = []
+                deadline = None
+
+    def _flush(self, records):
+        # Influx je nedavno pao -> pravo u spill, ingest ne ceka HTTP timeout
+        if self.spill is not None and time.monotonic() < self._down_until:
+            if not self._spill(records):
+                with self._stats_lock:
+                    self._stats["failed"] += len(records)
+            return
+
+        t0 = time.perf_counter()
+        try:
+            self._write_api.write(bucket=self.bucket, org=self.org, record=records)
+            ok = True
+        except Exception as e:
+            if is_rejected(e):
+                # Influx radi, ali ne prima ove tacke: bez spill-a i bez _mark_down
+                self._reject(records, e, "INFLUX SAVE")
+                ok = None
+            else:
+                log.error("INFLUX SAVE ERROR: %s", e)
+                self._mark_down()
+                ok = False
+        ms = (time.perf_counter() - t0) * 1000.0
+        self._flush_ms.add(ms)
+
+        if ok is False and self._spill(records):
+            ok = None
+
+        with self._stats_lock:
+            s = self._stats
+            s["batches"] += 1
+            s["last_batch_size"] = len(records)
+            s["last_flush_ms"] = round(ms, 3)
+            s["max_flush_ms"] = max(s["max_flush_ms"], round(ms, 3))
+            s["total_flush_ms"] += ms
+            if ok:
+                s["written"] += len(records)
+            elif ok is False:
+                s["failed"] += len(records)
+
+    def _replay_run(self):
+        while not self._stop.is_set():
+            if time.monotonic() < self._down_until:
+                self._stop.wait(min(1.0, self.retry_s))
+                continue
+
+            batch = self.spill.read_batch(self.replay_batch_size)
+            if batch is None:
+                self._stop.wait(1.0)
+                continue
+
+            token, lines = batch
+            try:
+                self._write_api.write(bucket=self.bucket, org=self.org, record=lines)
+            except Exception as e:
+                if not is_rejected(e):
+                    log.error("SPILL REPLAY ERROR: %s", e)
+                    self._mark_down()
+                    continue
+                # odbijen batch se ne ponavlja zauvek: commit i dalje
+                self._reject(lines, e, "SPILL REPLAY")
+                self.spill.commit(token)
+                continue
+
+            self.spill.commit(token)
+            with self._stats_lock:
+                self._stats["replayed"] += len(lines)
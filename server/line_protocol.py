@@ -0,0 +1,114 @@
+import math
+
+
+# ista pravila escape-ovanja kao influxdb_client Point
+_ESCAPE_MEASUREMENT = str.maketrans({
+    ",": r"\,",
+    " ": r"\ ",
+    "\n": r"\n",
+    "\t": r"\t",
+    "\r": r"\r",
+})
+
+_ESCAPE_KEY = str.maketrans({
+    ",": r"\,",
+    "=": r"\=",
+    " ": r"\ ",
+    "\n": r"\n",
+    "\t": r"\t",
+    "\r": r"\r",
+})
+
+_ESCAPE_STRING = str.maketrans({
+    '"': r'\"',
+    "\\": r"\\",
+})
+
+
+def _escape_tag_value(s: str) -> str:
+    ret = s.translate(_ESCAPE_KEY)
+    if ret.endswith("\\"):
+        ret += " "
+    return ret
+
+
+class LineProtocolEncoder:
+    """
+    Direktna serijalizacija senzorskih poruka u InfluxDB line protocol:
+    - prefiks "measurement,name=..,runs_on=..,simulated=.." se kesira po uredjaju
+    - po tacki se formatira samo polje i timestamp (ns)
+    - ista pravila za tip polja kao save_to_db preko Point-a
+    """
+
+    def __init__(self, max_cache=1024):
+        self._prefix_cache = {}
+        self._max_cache = int(max_cache)
+
+    def prefix(self, measurement: str, simulated: str, runs_on: str, name: str) -> str:
+        key = (measurement, simulated, runs_on, name)
+        p = self._prefix_cache.get(key)
+        if p is not None:
+            return p
+
+        # tagovi sortirani po kljucu, prazne vrednosti se izostavljaju (kao Point)
+        parts = [measurement.translate(_ESCAPE_MEASUREMENT)]
+        for k, v in (("name", name), ("runs_on", runs_on), ("simulated", simulated)):
+            v = _escape_tag_value(v)
+            if v:
+                parts.append(f"{k}={v}")
+        p = ",".join(parts)
+
+        if len(self._prefix_cache) >= self._max_cache:
+            self._prefix_cache.clear()
+        self._prefix_cache[key] = p
+        return p
+
+    def encode(self, data: dict, ts_ns: int):
+        """
+        Vraca jednu liniju (bez "\\n") ili None ako poruka nema sta da se upise.
+        """
+        if "measurement" not in data:
+            return None
+
+        measurement = str(data["measurement"])
+        name = str(data.get("name", ""))
+
+        field = self.format_field(measurement, name, data.get("value", None))
+        if field is None:
+            return None
+
+        prefix = self.prefix(
+            measurement,
+            str(data.get("simulated", True)),
+            str(data.get("runs_on", "")),
+            name,
+        )
+        return f"{prefix} {field} {int(ts_ns)}"
+
+    @staticmethod
+    def format_field(measurement: str, name: str, value):
+        if measurement == "IR" or name == "IR":
+            text = "" if value is None else str(value)
+            return f'value_text="{text.translate(_ESCAPE_STRING)}"'
+
+        if isinstance(value, bool):
+            return "value=true" if value else "value=false"
+
+        if isinstance(value, int):
+            return f"value={value}i"
+
+        if not isinstance(value, float):
+            try:
+                value = float(value)
+            except Exception:
+                return f'value_text="{str(value).translate(_ESCAPE_STRING)}"'
+
+        # InfluxDB ne prima NaN/Inf
+        if not math.isfinite(value):
+            return None
+
+        # cele brojeve kao float pisemo bez ".0" (kao Point)
+        s = str(value)
+        if s.endswith(".0"):
+            s = s[:-2]
+        return f"value={s}"
@@ -0,0 +1,385 @@
+"""
+Snimanje MQTT saobracaja i replay kao load generator za controller.py.
+
+    # snimi sve poruke sa broker-a (Ctrl+C za kraj)
+    python mqtt_replay.py record traffic.mqtr [--duration 600]
+
+    # lazni Influx na :8086 (controller upisuje u njega umesto u pravi)
+    python mqtt_replay.py fake-influx [--port 8086]
+
+    # replay 10x brzinom (ili --speed 0 = najbrze moguce) i izvestaj iz /metrics
+    python mqtt_replay.py replay traffic.mqtr --speed 10 [--fake-influx]
+
+Za merenje: pokrenuti controller.py dok pravi Influx nije na 8086 i replay sa
+--fake-influx (ili fake-influx u posebnom procesu).
+
+Replay pomera "ts" u porukama (i vremena IMU uzoraka) za razliku izmedju
+snimanja i slanja, pa tacke u bazi dobijaju vreme replay-a, a latencija u
+fake-influx-u se meri od slanja (--keep-ts salje poruke kako su snimljene).
+
+Format fajla: gzip, zaglavlje MAGIC, pa po poruci
+struct "<dBHI" (ts, qos, duzina topic-a, duzina payload-a) + topic + payload.
+"""
+import argparse
+import gzip
+import json
+import struct
+import sys
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import paho.mqtt.client as mqtt
+
+import compact
+from latency import LatencySamples
+
+
+MAGIC = b"MQTR1\n"
+_HEADER = struct.Struct("<dBHI")
+
+STABLE_S = 1.0
+
+
+# -----------------------------
+# Fajl
+# -----------------------------
+class TrafficWriter:
+    def __init__(self, path):
+        self._f = gzip.open(path, "wb")
+        self._f.write(MAGIC)
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def write(self, ts: float, topic: str, payload: bytes, qos: int = 0):
+        t = topic.encode()
+        with self._lock:
+            self._f.write(_HEADER.pack(ts, qos, len(t), len(payload)))
+            self._f.write(t)
+            self._f.write(payload)
+            self.count += 1
+
+    def close(self):
+        with self._lock:
+            self._f.close()
+
+
+def read_traffic(path):
+    """
+    Generator (ts, topic, payload, qos) redom kako su snimljene.
+    """
+    with gzip.open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path}: not a traffic recording")
+
+        while True:
+            head = f.read(_HEADER.size)
+            if len(head) < _HEADER.size:
+                return
+            ts, qos, tlen, plen = _HEADER.unpack(head)
+            topic = f.read(tlen).decode()
+            payload = f.read(plen)
+            yield ts, topic, payload, qos
+
+
+# -----------------------------
+# Lazni Influx
+# -----------------------------
+class FakeInflux:
+    """
+    Minimalni InfluxDB v2 HTTP endpoint: /api/v2/write prima line protocol i
+    meri kasnjenje (prijem - timestamp tacke, tj. vreme od prijema poruke u
+    kontroleru do upisa); /api/v2/query vraca prazan rezultat.
+    """
+
+    def __init__(self, host="127.0.0.1", port=8086):
+        self.lines = 0
+        self.requests = 0
+        self.latency = LatencySamples(maxlen=100000)
+        self._lock = threading.Lock()
+
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                if self.headers.get("Content-Encoding") == "gzip":
+                    body = gzip.decompress(body)
+
+                if self.path.startswith("/api/v2/write"):
+                    fake._record(body)
+                    self.send_response(204)
+                    self.end_headers()
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", "text/csv")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def do_GET(self):
+                self.send_response(204)
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, int(port)), Handler)
+        self._thread = None
+
+    def _record(self, body: bytes):
+        now_ns = time.time_ns()
+        n = 0
+        for line in body.splitlines():
+            if not line:
+                continue
+            n += 1
+            try:
+                ts_ns = int(line.rsplit(b" ", 1)[1])
+                self.latency.add((now_ns - ts_ns) / 1e6)
+            except (IndexError, ValueError):
+                pass
+
+        with self._lock:
+            self.lines += n
+            self.requests += 1
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"requests": self.requests, "lines": self.lines, "latency": self.latency.percentiles()}
+
+
+# -----------------------------
+# Komande
+# -----------------------------
+def cmd_record(args):
+    writer = TrafficWriter(args.file)
+
+    def on_connect(client, userdata, flags, rc):
+        client.subscribe(args.topic)
+        print(f"recording {args.topic} from {args.host}:{args.port} -> {args.file}")
+
+    def on_message(client, userdata, msg):
+        # zadrzane poruke pri pretplati su staro stanje, ne saobracaj
+        if msg.retain:
+            return
+        writer.write(time.time(), msg.topic, msg.payload, msg.qos)
+
+    client = mqtt.Client()
+    client.on_connect = on_connect
+    client.on_message = on_message
+    client.connect(args.host, args.port, 60)
+    client.loop_start()
+
+    t0 = time.time()
+    try:
+        while args.duration is None or time.time() - t0 < args.duration:
+            time.sleep(1.0)
+            print(f"\r{writer.count} messages", end="", flush=True)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        client.loop_stop()
+        client.disconnect()
+        writer.close()
+    print(f"\nrecorded {writer.count} messages in {time.time() - t0:.1f}s")
+
+
+def cmd_fake_influx(args):
+    fake = FakeInflux(args.bind, args.port).start()
+    print(f"fake influx on {args.bind}:{args.port}")
+    try:
+        while True:
+            time.sleep(5.0)
+            print(json.dumps(fake.stats()))
+    except KeyboardInterrupt:
+        fake.stop()
+
+
+def _get_metrics(url):
+    try:
+        with urllib.request.urlopen(url.rstrip("/") + "/metrics", timeout=5) as r:
+            return json.loads(r.read())
+    except Exception as e:
+        print(f"[WARN] metrics unavailable: {e}")
+        return None
+
+
+def _delta(after, before, *path):
+    a, b = after, before
+    for p in path:
+        a = (a or {}).get(p)
+        b = (b or {}).get(p)
+    if a is None:
+        return None
+    return a - (b or 0)
+
+
+def restamp(topic: str, payload: bytes, shift: float) -> bytes:
+    """
+    Pomera "ts" poruke (JSON ili compact) i vremena IMU uzoraka za shift
+    sekundi; poruke bez vremena ili neispravne vraca kako jesu.
+    """
+    try:
+        if compact.is_compact(payload):
+            data = compact.decode(topic, payload)
+        else:
+            data = json.loads(payload)
+    except (ValueError, UnicodeDecodeError):
+        return payload
+    if not isinstance(data, dict):
+        return payload
+
+    changed = False
+    ts = data.get("ts")
+    if isinstance(ts, (int, float)) and not isinstance(ts, bool):
+        data["ts"] = ts + shift
+        changed = True
+    samples = data.get("samples")
+    if isinstance(samples, list):
+        for s in samples:
+            if isinstance(s, list) and s and isinstance(s[0], (int, float)):
+                s[0] += shift
+                changed = True
+    if not changed:
+        return payload
+
+    if compact.is_compact(payload):
+        return compact.encode(topic, data) or payload
+    return json.dumps(data).encode()
+
+
+def cmd_replay(args):
+    fake = FakeInflux(args.bind, args.influx_port).start() if args.fake_influx else None
+
+    client = mqtt.Client()
+    client.max_queued_messages_set(0)
+    client.connect(args.host, args.port, 60)
+    client.loop_start()
+
+    before = _get_metrics(args.controller)
+
+    published = 0
+    t0 = time.monotonic()
+    first_ts = None
+    for ts, topic, payload, qos in read_traffic(args.file):
+        if args.speed > 0:
+            if first_ts is None:
+                first_ts = ts
+            wait = (ts - first_ts) / args.speed - (time.monotonic() - t0)
+            if wait > 0:
+                time.sleep(wait)
+
+        if not args.keep_ts:
+            payload = restamp(topic, payload, time.time() - ts)
+        client.publish(topic, payload, qos=qos)
+        published += 1
+        if args.limit and published >= args.limit:
+            break
+
+    publish_s = time.monotonic() - t0
+
+    # sacekaj da poruke stignu (broker/paho redovi) i da controller isprazni svoje:
+    # kraj kada su redovi prazni i brojaci se ne menjaju STABLE_S sekundi
+    after = _get_metrics(args.controller)
+    deadline = time.monotonic() + args.drain_s
+    last_change = time.monotonic()
+    total_s = time.monotonic() - t0
+    while after is not None and time.monotonic() < deadline:
+        time.sleep(0.2)
+        cur = _get_metrics(args.controller)
+        if cur is None:
+            break
+
+        progressed = (cur["workers"]["processed"], cur["influx_writer"]["written"]) != \
+                     (after["workers"]["processed"], after["influx_writer"]["written"])
+        after = cur
+        if progressed:
+            last_change = time.monotonic()
+            total_s = last_change - t0
+        elif (cur["workers"]["queue_depth"] == 0 and cur["influx_writer"]["queue_depth"] == 0
+              and time.monotonic() - last_change >= STABLE_S):
+            break
+
+    client.loop_stop()
+    client.disconnect()
+
+    report = {
+        "published": published,
+        "publish_s": round(publish_s, 3),
+        "publish_rate": round(published / publish_s, 1) if publish_s else None,
+        "speed": args.speed or "max",
+    }
+
+    if after is not None:
+        processed = _delta(after, before, "workers", "processed")
+        rejected = _delta(after, before, "router", "rejected")
+        report["controller"] = {
+            "processed": processed,
+            "processed_rate": round(processed / total_s, 1) if processed and total_s else None,
+            "dropped_in_workers": _delta(after, before, "workers", "dropped"),
+            "rejected_by_router": rejected,
+            # ukljucuje i teme na koje controller nije pretplacen (npr. home/actuators/*)
+            "unaccounted": published - (processed or 0) - (rejected or 0)
+                           - (_delta(after, before, "workers", "dropped") or 0),
+            "worker_lag": after["workers"].get("lag"),
+            "influx_flush": after["influx_writer"].get("flush"),
+            "influx_written": _delta(after, before, "influx_writer", "written"),
+            "influx_dropped": _delta(after, before, "influx_writer", "dropped"),
+            "influx_spilled": _delta(after, before, "influx_writer", "spilled"),
+            "persist_filter_ratio": (after.get("persist_filter") or {}).get("compression_ratio"),
+        }
+
+    if fake is not None:
+        report["fake_influx"] = fake.stats()
+        fake.stop()
+
+    print(json.dumps(report, indent=2))
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="MQTT record/replay load generator")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=1883)
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    rec = sub.add_parser("record")
+    rec.add_argument("file")
+    rec.add_argument("--topic", default="#")
+    rec.add_argument("--duration", type=float, default=None)
+    rec.set_defaults(func=cmd_record)
+
+    fi = sub.add_parser("fake-influx")
+    fi.add_argument("--bind", default="127.0.0.1")
+    fi.add_argument("--port", type=int, default=8086)
+    fi.set_defaults(func=cmd_fake_influx)
+
+    rp = sub.add_parser("replay")
+    rp.add_argument("file")
+    rp.add_argument("--speed", type=float, default=1.0, help="1-100x, 0 = najbrze moguce")
+    rp.add_argument("--limit", type=int, default=0)
+    rp.add_argument("--controller", default="http://127.0.0.1:5001")
+    rp.add_argument("--drain-s", type=float, default=30.0)
+    rp.add_argument("--keep-ts", action="store_true", help="ne pomeraj \"ts\" u porukama")
+    rp.add_argument("--fake-influx", action="store_true")
+    rp.add_argument("--bind", default="127.0.0.1")
+    rp.add_argument("--influx-port", type=int, default=8086)
+    rp.set_defaults(func=cmd_replay)
+
+    args = ap.parse_args(argv)
+    if args.cmd == "replay" and not (0 <= args.speed <= 100):
+        ap.error("--speed must be between 0 and 100")
+    args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
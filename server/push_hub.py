@@ -0,0 +1,130 @@
+import threading
+from collections import OrderedDict
+
+
+class PushClient:
+    """
+    Red dogadjaja za jednog klijenta (npr. SSE konekciju):
+    - dogadjaji se cuvaju po kljucu (npr. "sensor:DS1"); novi dogadjaj sa istim
+      kljucem zamenjuje stari dok ga klijent ne pokupi (spor klijent dobija
+      samo poslednju vrednost)
+    - najvise max_pending razlicitih kljuceva; preko toga se izbacuje najstariji
+    """
+
+    def __init__(self, max_pending=256):
+        self.max_pending = int(max_pending)
+        self._pending = OrderedDict()   # key -> (version, event, data)
+        self._cond = threading.Condition()
+        self._closed = False
+
+        self.sent = 0
+        self.coalesced = 0
+        self.dropped = 0
+
+    def offer(self, key, version, event, data):
+        with self._cond:
+            if self._closed:
+                return
+
+            if key in self._pending:
+                self._pending[key] = (version, event, data)
+                self.coalesced += 1
+            else:
+                if len(self._pending) >= self.max_pending:
+                    self._pending.popitem(last=False)
+                    self.dropped += 1
+                self._pending[key] = (version, event, data)
+
+            self._cond.notify()
+
+    def drain(self, timeout=None) -> list:
+        """
+        Ceka do `timeout` sekundi na dogadjaje i vraca sve pristigle
+        [(version, event, data), ...] po redu kojim su se kljucevi pojavili.
+        """
+        with self._cond:
+            if not self._pending and not self._closed:
+                self._cond.wait(timeout)
+
+            items = list(self._pending.values())
+            self._pending.clear()
+
+        self.sent += len(items)
+        return items
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._pending.clear()
+            self._cond.notify_all()
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+
+class PushHub:
+    """
+    Fan-out dogadjaja promene stanja ka svim pretplacenim klijentima.
+    publish() samo ubacuje u redove klijenata, nikad ne ceka na mrezu.
+    """
+
+    def __init__(self, max_clients=32, max_pending=256):
+        self.max_clients = int(max_clients)
+        self.max_pending = int(max_pending)
+        self._clients = set()
+        self._lock = threading.Lock()
+
+        self._published = 0
+        self._rejected = 0
+        self._closed_sent = 0
+        self._closed_coalesced = 0
+        self._closed_dropped = 0
+
+    def subscribe(self):
+        """
+        Vraca novog PushClient-a ili None ako je dostignut max_clients.
+        """
+        with self._lock:
+            if len(self._clients) >= self.max_clients:
+                self._rejected += 1
+                return None
+            client = PushClient(self.max_pending)
+            self._clients.add(client)
+            return client
+
+    def unsubscribe(self, client):
+        client.close()
+        with self._lock:
+            if client in self._clients:
+                self._clients.discard(client)
+                self._closed_sent += client.sent
+                self._closed_coalesced += client.coalesced
+                self._closed_dropped += client.dropped
+
+    def publish(self, key, version, event, data):
+        with self._lock:
+            clients = list(self._clients)
+            self._published += 1
+
+        for client in clients:
+            client.offer(key, version, event, data)
+
+    def stats(self) -> dict:
+        with self._lock:
+            clients = list(self._clients)
+            s = {
+                "clients": len(clients),
+                "max_clients": self.max_clients,
+                "published": self._published,
+                "rejected": self._rejected,
+                "sent": self._closed_sent,
+                "coalesced": self._closed_coalesced,
+                "dropped": self._closed_dropped,
+            }
+
+        for c in clients:
+            s["sent"] += c.sent
+            s["coalesced"] += c.coalesced
+            s["dropped"] += c.dropped
+        return s
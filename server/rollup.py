@@ -0,0 +1,195 @@
+import math
+import threading
+from array import array
+
+
+# (oznaka, rezolucija u sekundama, broj bucket-a): poslednji minut, sat i dan
+DEFAULT_RESOLUTIONS = (
+    ("1s", 1, 60),
+    ("1m", 60, 60),
+    ("15m", 900, 96),
+)
+
+
+class Rollup:
+    """
+    Agregati po bucket-ima fiksne rezolucije u kruznim array('d') nizovima:
+    - update je O(1): uzorak ide u bucket floor(ts / resolution_s)
+    - bucket iz proslog kruga se resetuje kada ga novi uzorak zauzme; uzorak
+      stariji od bucket-a koji je vec u slotu (zakasneli, van prozora) se preskace
+    - stats() sabira samo bucket-e koji su jos unutar prozora
+    """
+
+    def __init__(self, resolution_s: float, slots: int):
+        self.resolution_s = float(resolution_s)
+        self.slots = max(2, int(slots))
+
+        zeros = bytes(8 * self.slots)
+        self._bucket = array("d", zeros)    # id bucket-a u slotu (-1 = prazno)
+        self._count = array("d", zeros)
+        self._sum = array("d", zeros)
+        self._min = array("d", zeros)
+        self._max = array("d", zeros)
+        for i in range(self.slots):
+            self._bucket[i] = -1.0
+
+    def update(self, ts: float, value: float):
+        b = math.floor(ts / self.resolution_s)
+        i = b % self.slots
+
+        if b < self._bucket[i]:
+            return
+
+        if self._bucket[i] != b:
+            self._bucket[i] = b
+            self._count[i] = 1.0
+            self._sum[i] = value
+            self._min[i] = value
+            self._max[i] = value
+            return
+
+        self._count[i] += 1.0
+        self._sum[i] += value
+        if value < self._min[i]:
+            self._min[i] = value
+        if value > self._max[i]:
+            self._max[i] = value
+
+    def stats(self, now: float) -> dict:
+        """
+        count/min/max/mean za poslednjih resolution_s * slots sekundi i
+        slope (promena po sekundi) kroz srednje vrednosti bucket-a.
+        """
+        newest = math.floor(now / self.resolution_s)
+        oldest = newest - self.slots + 1
+
+        count = 0.0
+        total = 0.0
+        lo = math.inf
+        hi = -math.inf
+
+        # regresija srednjih vrednosti bucket-a po vremenu (t relativno na oldest)
+        n = 0
+        st = sx = stt = stx = 0.0
+
+        bucket = self._bucket
+        for i in range(self.slots):
+            b = bucket[i]
+            if b < oldest or b > newest:
+                continue
+
+            c = self._count[i]
+            s = self._sum[i]
+            count += c
+            total += s
+            if self._min[i] < lo:
+                lo = self._min[i]
+            if self._max[i] > hi:
+                hi = self._max[i]
+
+            t = (b - oldest) * self.resolution_s
+            x = s / c
+            n += 1
+            st += t
+            sx += x
+            stt += t * t
+            stx += t * x
+
+        if not count:
+            return {"count": 0, "min": None, "max": None, "mean": None, "slope": None}
+
+        slope = None
+        den = n * stt - st * st
+        if n >= 2 and den:
+            slope = (n * stx - st * sx) / den
+
+        return {"count": int(count), "min": lo, "max": hi, "mean": total / count, "slope": slope}
+
+
+class SensorRollup:
+    """
+    Poslednja vrednost + Rollup za svaku rezoluciju, za jedan (senzor, merenje).
+    """
+
+    def __init__(self, resolutions=DEFAULT_RESOLUTIONS):
+        self._rollups = [(label, res, Rollup(res, slots)) for label, res, slots in resolutions]
+        self._last_ts = None
+        self._last_value = None
+        self._lock = threading.Lock()
+
+    def update(self, ts: float, value: float):
+        with self._lock:
+            # zakasneli uzorak (outbox posle prekida) ne vraca "current" unazad
+            if self._last_ts is None or ts >= self._last_ts:
+                self._last_ts = ts
+                self._last_value = value
+            for _, _, r in self._rollups:
+                r.update(ts, value)
+
+    def stats(self, now: float) -> dict:
+        with self._lock:
+            out = {"current": {"value": self._last_value, "ts": self._last_ts}}
+            for label, res, r in self._rollups:
+                s = r.stats(now)
+                s["span_s"] = res * r.slots
+                out[label] = s
+        return out
+
+
+class RollupStore:
+    """
+    SensorRollup po (name, measurement), pravi se pri prvoj poruci.
+    Nenumericke vrednosti (npr. IR tekst) i NaN/Inf se preskacu.
+    """
+
+    def __init__(self, resolutions=DEFAULT_RESOLUTIONS, max_series=256):
+        self.resolutions = tuple(resolutions)
+        self.max_series = int(max_series)
+        self._series = {}       # name -> {measurement: SensorRollup}
+        self._count = 0
+        self._lock = threading.Lock()
+        self.rejected = 0
+
+    def record(self, name: str, measurement: str, value, ts: float) -> bool:
+        if isinstance(value, bool):
+            value = 1.0 if value else 0.0
+        else:
+            try:
+                value = float(value)
+            except (TypeError, ValueError):
+                return False
+        if not math.isfinite(value):
+            return False
+
+        per_name = self._series.get(name)
+        r = per_name.get(measurement) if per_name is not None else None
+        if r is None:
+            with self._lock:
+                per_name = self._series.setdefault(name, {})
+                r = per_name.get(measurement)
+                if r is None:
+                    if self._count >= self.max_series:
+                        self.rejected += 1
+                        return False
+                    r = per_name[measurement] = SensorRollup(self.resolutions)
+                    self._count += 1
+
+        r.update(ts, value)
+        return True
+
+    def names(self) -> list:
+        return sorted(self._series.keys())
+
+    def stats(self, name: str, now: float, measurement=None):
+        """
+        {measurement: {...}} za senzor ili None ako senzor nije vidjen.
+        """
+        per_name = self._series.get(name)
+        if per_name is None:
+            return None
+
+        return {
+            m: r.stats(now)
+            for m, r in list(per_name.items())
+            if measurement is None or m == measurement
+        }
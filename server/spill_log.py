@@ -0,0 +1,215 @@
+import logging
+import os
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+
+FSYNC_POLICIES = ("always", "interval", "never")
+
+_SEGMENT_PREFIX = "spill-"
+_SEGMENT_SUFFIX = ".log"
+_POS_FILE = "replay.pos"
+
+
+class SpillLog:
+    """
+    Lokalni append-only log (line protocol, jedna tacka po liniji) za tacke
+    koje nisu mogle u Influx:
+    - segmenti spill-<seq>.log do segment_bytes; ukupno najvise max_bytes,
+      preko toga se brise najstariji segment
+    - fsync: always (posle svakog append-a), interval (najvise jednom u
+      fsync_interval_s), never (ostavlja OS-u)
+    - jedan citalac: read_batch() -> upis -> commit(); pozicija se cuva u
+      replay.pos, pa se posle restarta nastavlja gde je stalo
+    """
+
+    def __init__(self, directory, segment_bytes=8 << 20, max_bytes=256 << 20,
+                 fsync="interval", fsync_interval_s=1.0):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"unknown fsync policy: {fsync}")
+
+        self.directory = directory
+        self.segment_bytes = int(segment_bytes)
+        self.max_bytes = int(max_bytes)
+        self.fsync = fsync
+        self.fsync_interval_s = float(fsync_interval_s)
+
+        os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._sizes = {}            # seq -> bytes, redom od najstarijeg
+        for fn in sorted(os.listdir(directory)):
+            if fn.startswith(_SEGMENT_PREFIX) and fn.endswith(_SEGMENT_SUFFIX):
+                seq = int(fn[len(_SEGMENT_PREFIX):-len(_SEGMENT_SUFFIX)])
+                self._sizes[seq] = os.path.getsize(self._path(seq))
+
+        self._active = None
+        self._active_seq = None
+        self._next_seq = max(self._sizes, default=0) + 1
+        self._last_fsync = 0.0
+
+        self._read_seq, self._read_off = self._load_pos()
+
+        self._stats = {
+            "spilled_lines": 0,
+            "replayed_lines": 0,
+            "replay_batches": 0,
+            "dropped_segments": 0,
+            "dropped_bytes": 0,
+            "fsyncs": 0,
+        }
+
+    def _path(self, seq) -> str:
+        return os.path.join(self.directory, f"{_SEGMENT_PREFIX}{seq:012d}{_SEGMENT_SUFFIX}")
+
+    def _load_pos(self):
+        try:
+            with open(os.path.join(self.directory, _POS_FILE)) as f:
+                seq, off = f.read().split()
+                return int(seq), int(off)
+        except (OSError, ValueError):
+            return None, 0
+
+    def _save_pos(self):
+        path = os.path.join(self.directory, _POS_FILE)
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            f.write(f"{self._read_seq or 0} {self._read_off}")
+        os.replace(tmp, path)
+
+    def _close_active(self):
+        if self._active is not None:
+            self._active.flush()
+            if self.fsync != "never":
+                os.fsync(self._active.fileno())
+                self._stats["fsyncs"] += 1
+            self._active.close()
+            self._active = None
+            self._active_seq = None
+
+    def _remove_segment(self, seq):
+        if seq == self._active_seq:
+            self._close_active()
+        self._sizes.pop(seq, None)
+        try:
+            os.remove(self._path(seq))
+        except OSError:
+            pass
+        if seq == self._read_seq:
+            self._read_seq, self._read_off = None, 0
+
+    def append(self, lines) -> bool:
+        if not lines:
+            return True
+        data = ("\n".join(lines) + "\n").encode()
+
+        with self._lock:
+            try:
+                if self._active is None or self._sizes[self._active_seq] + len(data) > self.segment_bytes:
+                    self._close_active()
+                    self._active_seq = self._next_seq
+                    self._next_seq += 1
+                    self._active = open(self._path(self._active_seq), "ab")
+                    self._sizes[self._active_seq] = 0
+
+                self._active.write(data)
+                self._active.flush()
+                self._sizes[self._active_seq] += len(data)
+
+                now = time.monotonic()
+                if self.fsync == "always" or (self.fsync == "interval" and now - self._last_fsync >= self.fsync_interval_s):
+                    os.fsync(self._active.fileno())
+                    self._last_fsync = now
+                    self._stats["fsyncs"] += 1
+            except OSError as e:
+                log.error("SPILL WRITE ERROR: %s", e)
+                return False
+
+            self._stats["spilled_lines"] += len(lines)
+
+            # cap: brisu se najstariji segmenti (ne aktivni)
+            while sum(self._sizes.values()) > self.max_bytes and len(self._sizes) > 1:
+                oldest = next(iter(self._sizes))
+                self._stats["dropped_segments"] += 1
+                self._stats["dropped_bytes"] += self._sizes[oldest]
+                log.warning("SPILL CAP: dropping segment %d", oldest)
+                self._remove_segment(oldest)
+
+        return True
+
+    def backlog_bytes(self) -> int:
+        with self._lock:
+            total = sum(self._sizes.values())
+            if self._read_seq in self._sizes:
+                total -= self._read_off
+            return total
+
+    def read_batch(self, max_lines=5000):
+        """
+        Vraca (token, lines) iz najstarijeg segmenta ili None ako nema nista.
+        Aktivni segment se zatvara pre citanja, pa citalac nikad ne cita fajl u koji se pise.
+        """
+        while True:
+            with self._lock:
+                if not self._sizes:
+                    return None
+
+                seq = next(iter(self._sizes))
+                if seq == self._active_seq:
+                    self._close_active()
+                off = self._read_off if seq == self._read_seq else 0
+
+            lines = []
+            eof = False
+            try:
+                with open(self._path(seq), "rb") as f:
+                    f.seek(off)
+                    while len(lines) < max_lines:
+                        raw = f.readline()
+                        if not raw.endswith(b"\n"):
+                            # kraj fajla (ili nedovrsena linija posle pada)
+                            eof = True
+                            break
+                        off += len(raw)
+                        line = raw[:-1].decode(errors="replace")
+                        if line:
+                            lines.append(line)
+            except OSError:
+                with self._lock:
+                    self._remove_segment(seq)
+                continue
+
+            if lines:
+                return (seq, off, eof, len(lines)), lines
+
+            # prazan ostatak segmenta -> gotov
+            with self._lock:
+                self._remove_segment(seq)
+                self._save_pos()
+
+    def commit(self, token):
+        seq, off, eof, n = token
+        with self._lock:
+            self._stats["replayed_lines"] += n
+            self._stats["replay_batches"] += 1
+
+            if seq not in self._sizes:
+                return
+
+            if eof:
+                self._remove_segment(seq)
+            else:
+                self._read_seq, self._read_off = seq, off
+            self._save_pos()
+
+    def stats(self) -> dict:
+        backlog = self.backlog_bytes()
+        with self._lock:
+            s = dict(self._stats)
+            s["segments"] = len(self._sizes)
+        s["backlog_bytes"] = backlog
+        s["max_bytes"] = self.max_bytes
+        s["fsync"] = self.fsync
+        return s
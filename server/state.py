@@ -0,0 +1,237 @@
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from types import MappingProxyType
+
+log = logging.getLogger(__name__)
+
+
+# -----------------------------
+# Stanje po podsistemu: svaki objekat ima svoj lock.
+# Ko menja polja drzi taj lock i odmah objavljuje novi snapshot tog dela.
+# Redosled lock-ova kada se ugnezdjuju: doors -> occupancy -> imu -> lights -> alarm.
+# -----------------------------
+
+class DoorState:
+    __slots__ = ("value", "since", "alarm_latched")
+
+    def __init__(self):
+        self.value = 0          # 0 = open, 1 = closed
+        self.since = None
+        self.alarm_latched = False
+
+    def snapshot(self) -> dict:
+        return {"value": self.value, "since": self.since, "alarm_latched": self.alarm_latched}
+
+
+class DoorsState:
+    __slots__ = ("lock", "doors")
+
+    def __init__(self, names):
+        self.lock = threading.Lock()
+        self.doors = {name: DoorState() for name in names}
+
+    def snapshot(self) -> dict:
+        return {name: d.snapshot() for name, d in self.doors.items()}
+
+
+class OccupancyState:
+    __slots__ = ("lock", "people_count", "empty_grace_until")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.people_count = 0
+        self.empty_grace_until = 0.0
+
+    def snapshot(self) -> dict:
+        return {"people_count": self.people_count, "empty_grace_until": self.empty_grace_until}
+
+
+class AlarmSource:
+    __slots__ = ("active", "reason")
+
+    def __init__(self):
+        self.active = False
+        self.reason = ""
+
+
+class AlarmState:
+    __slots__ = ("lock", "sources", "on", "reason", "reasons")
+
+    def __init__(self, source_keys):
+        self.lock = threading.Lock()
+        self.sources = {k: AlarmSource() for k in source_keys}
+        self.on = False
+        self.reason = ""
+        self.reasons = []
+
+    def recompute(self):
+        """
+        Osvezava razloge; vraca novo stanje (True/False) ako se alarm promenio, inace None.
+        """
+        reasons = [src.reason or k for k, src in self.sources.items() if src.active]
+        self.reasons = reasons
+        self.reason = "; ".join(reasons)
+
+        desired = bool(reasons)
+        if desired == self.on:
+            return None
+
+        self.on = desired
+        return desired
+
+    def snapshot(self) -> dict:
+        return {
+            "on": self.on,
+            "reason": self.reason,
+            "reasons": list(self.reasons),
+            "sources": {k: {"active": s.active, "reason": s.reason} for k, s in self.sources.items()},
+        }
+
+
+class ImuState:
+    __slots__ = ("lock", "accel", "gyro", "last_trigger", "cooldown")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.accel = {"x": None, "y": None, "z": None}
+        self.gyro = {"x": None, "y": None, "z": None}
+        self.last_trigger = 0.0
+        self.cooldown = False
+
+    def snapshot(self) -> dict:
+        return {
+            "accel": dict(self.accel),
+            "gyro": dict(self.gyro),
+            "last_trigger": self.last_trigger,
+            "cooldown": self.cooldown,
+        }
+
+
+class LightsState:
+    __slots__ = ("lock", "dl1_on", "dl1_until")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.dl1_on = False
+        self.dl1_until = 0.0
+
+    def snapshot(self) -> dict:
+        return {"dl1_on": self.dl1_on, "dl1_until": self.dl1_until}
+
+
+class SnapshotStore:
+    """
+    Poslednji objavljeni snapshot celog stanja:
+    - publish() pravi novi mapping (stari se nikad ne menja) i menja referencu
+    - citaoci (npr. /status) samo procitaju `current`, bez lock-a
+    - version raste za svaku objavu; pocinje od wall-clock mikrosekundi,
+      pa i posle restarta ostaje veca od svih ranijih
+    - listener-i (subscribe) se zovu za svaku objavu, pod lock-om, redom verzija;
+      moraju biti brzi (npr. samo ubace dogadjaj u red)
+    """
+
+    def __init__(self, initial: dict):
+        self._lock = threading.Lock()
+        self._listeners = []
+        # (version, mapping) se menja kao jedna referenca
+        self._state = (time.time_ns() // 1000, MappingProxyType(dict(initial)))
+
+    @property
+    def current(self):
+        return self._state[1]
+
+    @property
+    def version(self) -> int:
+        return self._state[0]
+
+    def subscribe(self, listener):
+        """
+        listener(version, part, key, value) posle svake objave.
+        """
+        with self._lock:
+            self._listeners.append(listener)
+
+    def read(self):
+        """
+        Vraca (version, snapshot) koji sigurno pripadaju jedno drugom.
+        """
+        return self._state
+
+    def publish(self, part: str, value, key=None):
+        """
+        Zamenjuje deo snapshot-a. Sa `key` menja samo jedan unos u delu koji je dict
+        (npr. sensors[name]), bez trke izmedju niti koje pisu razlicite kljuceve.
+        """
+        with self._lock:
+            version, current = self._state
+            new = dict(current)
+            if key is None:
+                new[part] = value
+            else:
+                sub = dict(new.get(part) or {})
+                sub[key] = value
+                new[part] = sub
+            self._state = (version + 1, MappingProxyType(new))
+
+            for listener in self._listeners:
+                try:
+                    listener(version + 1, part, key, value)
+                except Exception:
+                    log.exception("snapshot listener failed")
+
+
+class StatusCache:
+    """
+    Kes izvedenog odgovora (npr. /status) po verziji snapshot-a:
+    - build(snapshot) i json.dumps se rade jednom po verziji, ne po zahtevu
+    - poslednjih `history` verzija se pamti za delta odgovore (?since=)
+    - JSON telo nosi i "version", da klijent zna sta da posalje kao since
+    """
+
+    def __init__(self, store: SnapshotStore, build, history=64):
+        self.store = store
+        self.build = build
+        self.history = int(history)
+        self._lock = threading.Lock()
+        self._built = OrderedDict()     # version -> dict
+        self._last = None               # (version, dict, json body)
+
+    def get(self):
+        """
+        Vraca (version, dict, json body) za trenutnu verziju.
+        """
+        version, snap = self.store.read()
+        last = self._last
+        if last is not None and last[0] == version:
+            return last
+
+        with self._lock:
+            last = self._last
+            if last is not None and last[0] == version:
+                return last
+
+            data = self.build(snap)
+            last = (version, data, json.dumps({**data, "version": version}))
+            self._last = last
+            self._built[version] = data
+            while len(self._built) > self.history:
+                self._built.popitem(last=False)
+            return last
+
+    def changed_since(self, since: int, version: int, data: dict):
+        """
+        Polja koja su se promenila od verzije `since` do `version`,
+        ili None ako `since` vise nije u istoriji (tada treba poslati sve).
+        """
+        if since == version:
+            return {}
+
+        with self._lock:
+            old = self._built.get(since)
+
+        if old is None:
+            return None
+        return {k: v for k, v in data.items() if k not in old or old[k] != v}
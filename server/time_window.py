@@ -0,0 +1,165 @@
+import threading
+from array import array
+from collections import deque
+
+
+class TimeWindow:
+    """
+    Vremenski prozor (poslednjih window_s sekundi) za (timestamp, value) uzorke:
+    - uzorci se cuvaju u kompaktnim array('d') nizovima
+    - stari uzorci se izbacuju sa leve strane pomeranjem pocetka (amortizovano O(1))
+    - min/max/mean/slope se odrzavaju inkrementalno, bez kopiranja prozora
+    """
+
+    def __init__(self, window_s: float):
+        self.window_s = float(window_s)
+
+        self._ts = array("d")
+        self._values = array("d")
+        self._start = 0
+
+        # monotoni redovi (ts, value) za min i max
+        self._min_q = deque()
+        self._max_q = deque()
+
+        # sume za mean i linearnu regresiju (t relativno na _t0)
+        self._t0 = None
+        self._sum_t = 0.0
+        self._sum_x = 0.0
+        self._sum_tt = 0.0
+        self._sum_tx = 0.0
+
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._ts) - self._start
+
+    def append(self, ts: float, value: float):
+        ts = float(ts)
+        value = float(value)
+
+        with self._lock:
+            if self._t0 is None:
+                self._t0 = ts
+
+            self._ts.append(ts)
+            self._values.append(value)
+            self._add(ts, value)
+
+            while self._min_q and self._min_q[-1][1] >= value:
+                self._min_q.pop()
+            self._min_q.append((ts, value))
+
+            while self._max_q and self._max_q[-1][1] <= value:
+                self._max_q.pop()
+            self._max_q.append((ts, value))
+
+            self._evict(ts)
+
+    def evict(self, now: float):
+        with self._lock:
+            self._evict(float(now))
+
+    def oldest(self):
+        with self._lock:
+            if len(self._ts) == self._start:
+                return None
+            return (self._ts[self._start], self._values[self._start])
+
+    def latest(self):
+        with self._lock:
+            if len(self._ts) == self._start:
+                return None
+            return (self._ts[-1], self._values[-1])
+
+    def last(self, n: int):
+        with self._lock:
+            start = max(self._start, len(self._ts) - int(n))
+            return list(zip(self._ts[start:], self._values[start:]))
+
+    def min(self):
+        with self._lock:
+            return self._min_q[0][1] if self._min_q else None
+
+    def max(self):
+        with self._lock:
+            return self._max_q[0][1] if self._max_q else None
+
+    def mean(self):
+        with self._lock:
+            n = len(self._ts) - self._start
+            return self._sum_x / n if n else None
+
+    def slope(self):
+        """
+        Nagib linearne regresije value po vremenu (jedinica po sekundi).
+        """
+        with self._lock:
+            return self._slope()
+
+    def stats(self, now=None) -> dict:
+        with self._lock:
+            if now is not None:
+                self._evict(float(now))
+
+            n = len(self._ts) - self._start
+            return {
+                "count": n,
+                "min": self._min_q[0][1] if self._min_q else None,
+                "max": self._max_q[0][1] if self._max_q else None,
+                "mean": self._sum_x / n if n else None,
+                "slope": self._slope(),
+            }
+
+    def _slope(self):
+        n = len(self._ts) - self._start
+        if n < 2:
+            return None
+        denom = n * self._sum_tt - self._sum_t * self._sum_t
+        if abs(denom) < 1e-12:
+            return None
+        return (n * self._sum_tx - self._sum_t * self._sum_x) / denom
+
+    def _add(self, ts, value):
+        t = ts - self._t0
+        self._sum_t += t
+        self._sum_x += value
+        self._sum_tt += t * t
+        self._sum_tx += t * value
+
+    def _evict(self, now):
+        cutoff = now - self.window_s
+        ts = self._ts
+        values = self._values
+        end = len(ts)
+
+        i = self._start
+        while i < end and ts[i] < cutoff:
+            t = ts[i] - self._t0
+            x = values[i]
+            self._sum_t -= t
+            self._sum_x -= x
+            self._sum_tt -= t * t
+            self._sum_tx -= t * x
+            i += 1
+        self._start = i
+
+        while self._min_q and self._min_q[0][0] < cutoff:
+            self._min_q.popleft()
+        while self._max_q and self._max_q[0][0] < cutoff:
+            self._max_q.popleft()
+
+        # kompakcija kada je vise od pola niza izbaceno
+        if self._start and self._start * 2 >= len(ts):
+            self._compact()
+
+    def _compact(self):
+        del self._ts[:self._start]
+        del self._values[:self._start]
+        self._start = 0
+
+        # ponovo izracunaj sume da se ne gomila greska od oduzimanja
+        self._t0 = self._ts[0] if self._ts else None
+        self._sum_t = self._sum_x = self._sum_tt = self._sum_tx = 0.0
+        for ts, value in zip(self._ts, self._values):
+            self._add(ts, value)
@@ -0,0 +1,124 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+
+log = logging.getLogger(__name__)
+
+
+class TimerScheduler:
+    """
+    One-shot tajmeri na jednoj pozadinskoj niti (min-heap po roku):
+    - svaki tajmer ima kljuc; novo zakazivanje sa istim kljucem zamenjuje staro
+    - cancel(key) ponistava tajmer pre isteka
+    - nit spava tacno do najblizeg roka (nema periodicnog budjenja)
+    - callback se poziva van internog lock-a
+    """
+
+    def __init__(self):
+        self._heap = []                 # (deadline_monotonic, seq, key)
+        self._timers = {}               # key -> (seq, callback)
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._stop = False
+        self._thread = None
+
+        self._fired = 0
+        self._cancelled = 0
+        self._last_late_ms = 0.0
+        self._max_late_ms = 0.0
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return self._thread
+
+        self._stop = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self, timeout=1.0):
+        with self._cond:
+            self._stop = True
+            self._cond.notify()
+        if self._thread:
+            self._thread.join(timeout=timeout)
+
+    def call_later(self, key, delay_s: float, callback):
+        deadline = time.monotonic() + max(0.0, float(delay_s))
+        self._schedule(key, deadline, callback)
+
+    def call_at(self, key, when: float, callback):
+        """
+        `when` je wall-clock (time.time()), kao i rokovi u stanju kontrolera.
+        """
+        self.call_later(key, float(when) - time.time(), callback)
+
+    def cancel(self, key) -> bool:
+        with self._cond:
+            if self._timers.pop(key, None) is None:
+                return False
+            self._cancelled += 1
+            return True
+
+    def is_pending(self, key) -> bool:
+        with self._cond:
+            return key in self._timers
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "pending": len(self._timers),
+                "fired": self._fired,
+                "cancelled": self._cancelled,
+                "last_late_ms": round(self._last_late_ms, 3),
+                "max_late_ms": round(self._max_late_ms, 3),
+            }
+
+    def _schedule(self, key, deadline, callback):
+        with self._cond:
+            seq = next(self._seq)
+            self._timers[key] = (seq, callback)
+            heapq.heappush(self._heap, (deadline, seq, key))
+            # probudi nit samo ako je novi tajmer najblizi
+            if self._heap[0][1] == seq:
+                self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                callback = None
+                while callback is None:
+                    if self._stop:
+                        return
+
+                    if not self._heap:
+                        self._cond.wait()
+                        continue
+
+                    deadline, seq, key = self._heap[0]
+                    entry = self._timers.get(key)
+                    if entry is None or entry[0] != seq:
+                        # ponisten ili zamenjen tajmer
+                        heapq.heappop(self._heap)
+                        continue
+
+                    delay = deadline - time.monotonic()
+                    if delay > 0:
+                        self._cond.wait(timeout=delay)
+                        continue
+
+                    heapq.heappop(self._heap)
+                    del self._timers[key]
+                    callback = entry[1]
+
+                    late_ms = -delay * 1000.0
+                    self._fired += 1
+                    self._last_late_ms = late_ms
+                    self._max_late_ms = max(self._max_late_ms, late_ms)
+
+            try:
+                callback()
+            except Exception:
+                log.exception("TIMER ERROR: %s", key)
@@ -0,0 +1,256 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+
+
+AGGREGATES = ("mean", "min", "max", "sum", "count", "first", "last", "median")
+
+# "30s", "10m", "2h", "7d" (Flux duration, jedna jedinica)
+_DURATION_RE = re.compile(r"^(\d{1,6})(s|m|h|d)$")
+_DURATION_S = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+# imena merenja/uredjaja iz topic-a, npr. "DHTHumidity", "PI2/GSG/Accelerometer X"
+_IDENT_RE = re.compile(r"^[A-Za-z0-9_./ -]{1,64}$")
+
+MAX_RANGE_S = 30 * 86400
+MIN_WINDOW_S = 1
+MAX_POINTS = 5000
+
+
+class QueryError(ValueError):
+    pass
+
+
+def _duration_s(s: str) -> int:
+    m = _DURATION_RE.match(s)
+    if not m:
+        raise QueryError(f"invalid duration: {s!r} (expected e.g. 30s, 10m, 2h, 7d)")
+    return int(m.group(1)) * _DURATION_S[m.group(2)]
+
+
+def _ident(field: str, v):
+    if v is None or v == "":
+        return None
+    v = str(v)
+    if not _IDENT_RE.match(v):
+        raise QueryError(f"invalid {field}: {v!r}")
+    return v
+
+
+def parse_params(args) -> tuple:
+    """
+    Validira parametre upita (dict ili request.args) i vraca normalizovan kljuc:
+    (measurement, name, runs_on, range_s, window_s, aggregate).
+    """
+    measurement = _ident("measurement", args.get("measurement"))
+    if measurement is None:
+        raise QueryError("measurement is required")
+
+    name = _ident("name", args.get("name"))
+    runs_on = _ident("runs_on", args.get("runs_on"))
+
+    range_s = _duration_s(str(args.get("range") or "10m").lstrip("-"))
+    if range_s <= 0 or range_s > MAX_RANGE_S:
+        raise QueryError(f"range must be between 1s and {MAX_RANGE_S}s")
+
+    window = args.get("window")
+    window_s = _duration_s(str(window)) if window else None
+
+    aggregate = args.get("aggregate")
+    if aggregate:
+        aggregate = str(aggregate).lower()
+        if aggregate not in AGGREGATES:
+            raise QueryError(f"aggregate must be one of {', '.join(AGGREGATES)}")
+    else:
+        aggregate = None
+
+    if window_s is not None:
+        if aggregate is None:
+            aggregate = "mean"
+        if window_s < MIN_WINDOW_S or range_s / window_s > MAX_POINTS:
+            raise QueryError(f"window too small for range (max {MAX_POINTS} points)")
+
+    return measurement, name, runs_on, range_s, window_s, aggregate
+
+
+def _flux_string(s: str) -> str:
+    return s.replace("\\", "\\\\").replace('"', '\\"')
+
+
+class FluxTemplates:
+    """
+    Flux tekst se sklapa jednom po obliku upita (koji filteri, window, agregat);
+    po pozivu se samo popune vrednosti koje su vec validirane.
+    """
+
+    def __init__(self, bucket: str):
+        self.bucket = bucket
+        self._compiled = {}
+        self._lock = threading.Lock()
+
+    def _compile(self, shape) -> str:
+        has_name, has_runs_on, has_window, aggregate = shape
+
+        lines = [
+            # bucket je deo sablona, pa njegove zagrade ne smeju u format()
+            'from(bucket: "' + _flux_string(self.bucket).replace("{", "{{").replace("}", "}}") + '")',
+            "  |> range(start: -{range_s}s)",
+            '  |> filter(fn: (r) => r._measurement == "{measurement}")',
+            # tekstualne vrednosti su u "value_text" i ne smeju u agregate
+            '  |> filter(fn: (r) => r._field == "value")',
+        ]
+        if has_name:
+            lines.append('  |> filter(fn: (r) => r.name == "{name}")')
+        if has_runs_on:
+            lines.append('  |> filter(fn: (r) => r.runs_on == "{runs_on}")')
+        if has_window:
+            lines.append(f"  |> aggregateWindow(every: {{window_s}}s, fn: {aggregate}, createEmpty: false)")
+        elif aggregate:
+            lines.append(f"  |> {aggregate}()")
+        return "\n".join(lines)
+
+    def render(self, key: tuple) -> str:
+        measurement, name, runs_on, range_s, window_s, aggregate = key
+        shape = (name is not None, runs_on is not None, window_s is not None, aggregate)
+
+        tpl = self._compiled.get(shape)
+        if tpl is None:
+            with self._lock:
+                tpl = self._compiled.setdefault(shape, self._compile(shape))
+
+        return tpl.format(
+            measurement=_flux_string(measurement),
+            name=_flux_string(name or ""),
+            runs_on=_flux_string(runs_on or ""),
+            range_s=range_s,
+            window_s=window_s or 0,
+        )
+
+    def stats(self) -> dict:
+        return {"compiled_shapes": len(self._compiled)}
+
+
+class TTLCache:
+    """
+    LRU kes sa rokom trajanja po unosu:
+    - get() vraca None za nepostojeci ili istekli unos
+    - preko max_entries izbacuje se najdavnije korisceni
+    """
+
+    def __init__(self, max_entries=256, ttl_s=5.0):
+        self.max_entries = int(max_entries)
+        self.ttl_s = float(ttl_s)
+        self._data = OrderedDict()      # key -> (expires_at, value)
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            if entry[0] <= now:
+                del self._data[key]
+                self.expired += 1
+                self.misses += 1
+                return None
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, value, ttl_s=None):
+        expires_at = time.monotonic() + (self.ttl_s if ttl_s is None else float(ttl_s))
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evicted += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._data),
+                "max_entries": self.max_entries,
+                "ttl_s": self.ttl_s,
+                "hits": self.hits,
+                "misses": self.misses,
+                "expired": self.expired,
+                "evicted": self.evicted,
+            }
+
+
+def record_point(record) -> dict:
+    values = record.values
+    t = record.get_time()
+    return {
+        "time": t.isoformat() if t is not None else None,
+        "value": record.get_value(),
+        "name": values.get("name"),
+        "runs_on": values.get("runs_on"),
+    }
+
+
+class TimeseriesService:
+    """
+    /timeseries: validacija -> Flux iz sablona -> Influx, rezultat u TTLCache.
+    Vraca samo time/value/name/runs_on po tacki umesto celog record.values.
+    """
+
+    def __init__(self, client, bucket, org, cache_size=256, cache_ttl_s=5.0):
+        self.org = org
+        self.templates = FluxTemplates(bucket)
+        self.cache = TTLCache(cache_size, cache_ttl_s)
+        self._query_api = client.query_api()
+
+    def query(self, args) -> dict:
+        key = parse_params(args)
+
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        flux = self.templates.render(key)
+        tables = self._query_api.query(flux, org=self.org)
+
+        points = [record_point(record) for table in tables for record in table.records]
+
+        measurement, name, runs_on, range_s, window_s, aggregate = key
+        result = {
+            "measurement": measurement,
+            "name": name,
+            "runs_on": runs_on,
+            "range_s": range_s,
+            "window_s": window_s,
+            "aggregate": aggregate,
+            "count": len(points),
+            "points": points,
+        }
+        self.cache.put(key, result)
+        return result
+
+    def open_stream(self, args):
+        """
+        Za velike range-ove: bez kesa, tacke se citaju redom kako stizu
+        (query_stream) i nikad se ne skupljaju u listu.
+        Validacija i slanje upita se rade odmah, pa greske idu pre prvog bajta odgovora.
+        """
+        key = parse_params(args)
+        records = self._query_api.query_stream(self.templates.render(key), org=self.org)
+        return (record_point(record) for record in records)
+
+    def stats(self) -> dict:
+        return {"cache": self.cache.stats(), **self.templates.stats()}
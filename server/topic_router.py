@@ -0,0 +1,79 @@
+import re
+
+
+_MISS = object()
+
+
+class Route:
+    __slots__ = ("topic_filter", "handler", "persist", "pattern")
+
+    def __init__(self, topic_filter, handler, persist):
+        self.topic_filter = topic_filter
+        self.handler = handler
+        self.persist = persist
+        self.pattern = _compile_filter(topic_filter)
+
+
+def _compile_filter(topic_filter: str):
+    """
+    MQTT filter -> regex:  "+" = jedan nivo, "#" (samo na kraju) = ostatak teme.
+    """
+    parts = topic_filter.split("/")
+    out = []
+    for i, part in enumerate(parts):
+        if part == "+":
+            out.append("[^/]+")
+        elif part == "#":
+            if i != len(parts) - 1:
+                raise ValueError(f"'#' must be the last level: {topic_filter}")
+            # "a/#" pokriva i samo "a"
+            if out:
+                return re.compile("^" + "/".join(out) + "(?:/.*)?$")
+            return re.compile("^.*$")
+        else:
+            out.append(re.escape(part))
+    return re.compile("^" + "/".join(out) + "$")
+
+
+class TopicRouter:
+    """
+    Tabela ruta: MQTT filter teme -> handler.
+    - prva ruta koja odgovara temi pobedjuje (redosled dodavanja)
+    - rezultat se kesira po tacnoj temi, pa je svaka sledeca poruka jedan dict lookup
+    - nepoznate teme vracaju None (poruka se odbacuje pre JSON dekodiranja)
+    """
+
+    def __init__(self, max_cache=4096):
+        self._routes = []
+        self._cache = {}
+        self._max_cache = int(max_cache)
+        self.rejected = 0
+
+    def add(self, topic_filter: str, handler, persist: bool = True):
+        self._routes.append(Route(topic_filter, handler, persist))
+        self._cache.clear()
+
+    def resolve(self, topic: str):
+        route = self._cache.get(topic, _MISS)
+
+        if route is _MISS:
+            route = None
+            for r in self._routes:
+                if r.pattern.match(topic):
+                    route = r
+                    break
+
+            if len(self._cache) >= self._max_cache:
+                self._cache.clear()
+            self._cache[topic] = route
+
+        if route is None:
+            self.rejected += 1
+        return route
+
+    def stats(self) -> dict:
+        return {
+            "routes": len(self._routes),
+            "cached_topics": len(self._cache),
+            "rejected": self.rejected,
+        }
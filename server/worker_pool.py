@@ -0,0 +1,166 @@
+import logging
+import queue
+import threading
+import time
+
+from latency import LatencySamples
+
+log = logging.getLogger(__name__)
+
+
+BACKPRESSURE_POLICIES = ("block", "drop_newest", "drop_oldest")
+
+
+class ShardedWorkerPool:
+    """
+    Pool radnih niti sa po jednim redom po niti:
+    - poruke sa istim kljucem (npr. ime senzora) uvek idu u isti shard,
+      pa se redosled po senzoru cuva
+    - backpressure kada je red pun (podrazumevano za pool, submit() moze da
+      zada drugu politiku za pojedinu poruku):
+        block       -> ceka do block_timeout_s, pa odbacuje poruku
+        drop_newest -> odbacuje novu poruku
+        drop_oldest -> izbacuje najstariju poruku iz reda i ubacuje novu
+    - svaka odbacena poruka se broji i loguje (WARNING)
+    """
+
+    def __init__(self, handler, num_workers=4, queue_size=10000, backpressure="block", block_timeout_s=1.0):
+        if backpressure not in BACKPRESSURE_POLICIES:
+            raise ValueError(f"unknown backpressure policy: {backpressure}")
+
+        self.handler = handler
+        self.num_workers = max(1, int(num_workers))
+        self.backpressure = backpressure
+        self.block_timeout_s = float(block_timeout_s)
+
+        self._queues = [queue.Queue(maxsize=int(queue_size)) for _ in range(self.num_workers)]
+        self._threads = []
+        self._stop = threading.Event()
+
+        self._stats_lock = threading.Lock()
+        self._lags = LatencySamples()
+        self._shard_stats = [
+            {"processed": 0, "dropped": 0, "errors": 0, "last_lag_ms": 0.0, "max_lag_ms": 0.0, "total_lag_ms": 0.0}
+            for _ in range(self.num_workers)
+        ]
+
+    def start(self):
+        if self._threads:
+            return self._threads
+
+        self._stop.clear()
+        for i in range(self.num_workers):
+            th = threading.Thread(target=self._run, args=(i,), daemon=True)
+            th.start()
+            self._threads.append(th)
+        return self._threads
+
+    def stop(self, timeout=2.0):
+        self._stop.set()
+        for th in self._threads:
+            th.join(timeout=timeout)
+        self._threads = []
+
+    def shard_for(self, key) -> int:
+        return hash(key) % self.num_workers
+
+    def submit(self, key, item, backpressure=None) -> bool:
+        policy = backpressure or self.backpressure
+        if policy not in BACKPRESSURE_POLICIES:
+            raise ValueError(f"unknown backpressure policy: {policy}")
+
+        shard = self.shard_for(key)
+        q = self._queues[shard]
+        entry = (time.monotonic(), item)
+
+        if policy == "block":
+            try:
+                q.put(entry, timeout=self.block_timeout_s)
+                return True
+            except queue.Full:
+                self._count_drop(shard, key, policy)
+                return False
+
+        try:
+            q.put_nowait(entry)
+            return True
+        except queue.Full:
+            pass
+
+        if policy == "drop_newest":
+            self._count_drop(shard, key, policy)
+            return False
+
+        # drop_oldest
+        try:
+            q.get_nowait()
+            self._count_drop(shard, "oldest queued", policy)
+        except queue.Empty:
+            pass
+        try:
+            q.put_nowait(entry)
+            return True
+        except queue.Full:
+            self._count_drop(shard, key, policy)
+            return False
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            shards = []
+            for i, s in enumerate(self._shard_stats):
+                processed = s["processed"]
+                shards.append({
+                    "shard": i,
+                    "queue_depth": self._queues[i].qsize(),
+                    "processed": processed,
+                    "dropped": s["dropped"],
+                    "errors": s["errors"],
+                    "last_lag_ms": round(s["last_lag_ms"], 3),
+                    "max_lag_ms": round(s["max_lag_ms"], 3),
+                    "avg_lag_ms": round(s["total_lag_ms"] / processed, 3) if processed else 0.0,
+                })
+
+        return {
+            "workers": self.num_workers,
+            "backpressure": self.backpressure,
+            "queue_depth": sum(s["queue_depth"] for s in shards),
+            "processed": sum(s["processed"] for s in shards),
+            "dropped": sum(s["dropped"] for s in shards),
+            "max_lag_ms": max((s["max_lag_ms"] for s in shards), default=0.0),
+            "lag": self._lags.percentiles(),
+            "shards": shards,
+        }
+
+    def _count_drop(self, shard, key, policy):
+        with self._stats_lock:
+            self._shard_stats[shard]["dropped"] += 1
+        log.warning("worker queue %d full, dropped message (%s) [%s]", shard, key, policy,
+                    extra={"category": f"worker.drop:{shard}"})
+
+    def _run(self, shard):
+        q = self._queues[shard]
+
+        while not self._stop.is_set():
+            try:
+                enqueued_at, item = q.get(timeout=0.5)
+            except queue.Empty:
+                continue
+
+            lag_ms = (time.monotonic() - enqueued_at) * 1000.0
+            self._lags.add(lag_ms)
+
+            failed = False
+            try:
+                self.handler(item)
+            except Exception as e:
+                log.exception("WORKER ERROR: %s", e)
+                failed = True
+
+            with self._stats_lock:
+                s = self._shard_stats[shard]
+                s["processed"] += 1
+                s["last_lag_ms"] = lag_ms
+                s["max_lag_ms"] = max(s["max_lag_ms"], lag_ms)
+                s["total_lag_ms"] += lag_ms
+                if failed:
+                    s["errors"] += 1
@@ -1,10 +1,65 @@
 import axios from "axios";
 
+const BASE_URL = "http://127.0.0.1:5001";
+
 const api = axios.create({
-  baseURL: "http://127.0.0.1:5001",
+  baseURL: BASE_URL,
 });
 
-export const getStatus = () => api.get("/status");
+// poslednji pun status; sledeci poziv trazi samo promene (?since=<version>)
+let lastStatus = null;
+
+export const getStatus = async () => {
+  const params = lastStatus ? { since: lastStatus.version } : {};
+  const res = await api.get("/status", {
+    params,
+    validateStatus: (s) => (s >= 200 && s < 300) || s === 304,
+  });
+
+  if (res.status === 304) {
+    return { ...res, data: lastStatus };
+  }
+
+  if (res.data?.delta) {
+    lastStatus = { ...lastStatus, ...res.data.changed, version: res.data.version };
+  } else {
+    lastStatus = res.data;
+  }
+  return { ...res, data: lastStatus };
+};
+
+// push umesto polling-a: /events salje ceo status, pa samo promene.
+// onStatus(status) dobija ceo (spojen) status posle svakog dogadjaja.
+// Vraca funkciju za odjavu.
+export const subscribeStatus = (onStatus, onError) => {
+  const es = new EventSource(`${BASE_URL}/events`);
+  let status = null;
+
+  const update = (fn) => (e) => {
+    const data = JSON.parse(e.data);
+    if (!status && e.type !== "status") return;
+    status = fn(status, data);
+    onStatus(status);
+  };
+
+  es.addEventListener("status", update((_, data) => data));
+  es.addEventListener("sensor", update((s, d) => ({
+    ...s,
+    sensors: { ...s.sensors, [d.name]: d.value },
+  })));
+  es.addEventListener("people_count", update((s, d) => ({ ...s, people_count: d.people_count })));
+  es.addEventListener("alarm", update((s, d) => ({ ...s, alarm_on: d.alarm_on, reason: d.reason })));
+  es.addEventListener("doors", update((s, d) => ({ ...s, ds_debug: d })));
+  es.addEventListener("lights", update((s, d) => ({ ...s, dl1_on: d.dl1_on, dl1_until: d.dl1_until })));
+  es.addEventListener("dus", update((s, d) => ({
+    ...s,
+    dus_history_last_5: { ...s.dus_history_last_5, [d.name]: d.last_5 },
+    dus_stats: { ...s.dus_stats, [d.name]: d.stats },
+  })));
+
+  if (onError) es.onerror = onError;
+  return () => es.close();
+};
 
 export const alarmOn = () => api.post("/alarm/on", {});
 export const alarmOff = () => api.post("/alarm/off", {});